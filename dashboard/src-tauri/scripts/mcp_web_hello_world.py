@@ -1,105 +1,45 @@
 """MCP Server: web_hello_world — WebページからHello Worldを取得して表示するMCPサーバー"""
 import asyncio
+import datetime
 import json
+import os
+import re
+import string
 
+import httpx
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import TextContent, Tool
 
+try:
+    import orjson
+except ImportError:  # 任意の高速化: pip install orjson
+    orjson = None
+
 app = Server("web_hello_world")
 
-@app.list_tools()
-async def list_tools() -> list[Tool]:
-    return [
-        Tool(
-            name="get_hello_world",
-            description="WebからHello Worldを取得して表示します",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "url": {
-                        "type": "string",
-                        "description": "Hello Worldを表示するWebページのURL（省略可）",
-                        "default": "https://example.com"
-                    }
-                },
-                "required": []
-            }
-        ),
-        Tool(
-            name="create_hello_world_page",
-            description="Hello Worldを表示する簡単なHTMLページを作成します",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "title": {
-                        "type": "string",
-                        "description": "ページのタイトル",
-                        "default": "Hello World Page"
-                    },
-                    "message": {
-                        "type": "string",
-                        "description": "表示するメッセージ",
-                        "default": "Hello World!"
-                    }
-                },
-                "required": []
-            }
-        )
-    ]
+# MCP_JSON_PRETTY=true でレスポンスJSONを整形出力（デバッグ用）
+_JSON_PRETTY = os.environ.get("MCP_JSON_PRETTY", "false").lower() == "true"
 
-@app.call_tool()
-async def call_tool(name: str, arguments: dict) -> list[TextContent]:
-    if name == "get_hello_world":
-        import httpx
-        url = arguments.get("url", "https://example.com")
-        
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, timeout=10.0)
-                response.raise_for_status()
-                
-                # ページからHello Worldを探す
-                content = response.text
-                if "Hello" in content or "hello" in content or "World" in content or "world" in content:
-                    result = {
-                        "success": True,
-                        "url": url,
-                        "status_code": response.status_code,
-                        "content_preview": content[:500] + "..." if len(content) > 500 else content,
-                        "message": "ページからHello World関連のコンテンツが見つかりました"
-                    }
-                else:
-                    result = {
-                        "success": True,
-                        "url": url,
-                        "status_code": response.status_code,
-                        "content_preview": content[:500] + "..." if len(content) > 500 else content,
-                        "message": "ページを取得しましたが、Hello Worldは見つかりませんでした"
-                    }
-                    
-        except Exception as e:
-            result = {
-                "success": False,
-                "url": url,
-                "error": str(e),
-                "message": "ページの取得に失敗しました"
-            }
-        
-        return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, indent=2))]
-    
-    elif name == "create_hello_world_page":
-        title = arguments.get("title", "Hello World Page")
-        message = arguments.get("message", "Hello World!")
-        
-        html_content = f"""<!DOCTYPE html>
+# 呼び出し間で共有するHTTPクライアント（_get_http_client で遅延作成）
+_http_client: httpx.AsyncClient | None = None
+
+# Hello/World 検出用（ページは先頭 _SCAN_LIMIT バイトまで取得し、見つかり次第打ち切る）
+# 対象語はASCIIのみなので、デコードせずバイト列のまま照合する
+_HELLO_RE = re.compile(rb"hello|world", re.IGNORECASE)
+_SCAN_LIMIT = 65536
+_MATCH_OVERLAP = 4  # len("hello") - 1
+_PREVIEW_BYTES = 2048  # プレビュー500文字分（UTF-8で最大4バイト/文字）
+
+# Hello Worldページのテンプレート（固定部分は起動時に一度だけ構築）
+_HTML_TEMPLATE = string.Template("""<!DOCTYPE html>
 <html lang="ja">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
+    <title>$title</title>
     <style>
-        body {{
+        body {
             font-family: Arial, sans-serif;
             display: flex;
             justify-content: center;
@@ -107,40 +47,188 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
             height: 100vh;
             margin: 0;
             background-color: #f0f0f0;
-        }}
-        .container {{
+        }
+        .container {
             text-align: center;
             padding: 40px;
             background-color: white;
             border-radius: 10px;
             box-shadow: 0 4px 6px rgba(0,0,0,0.1);
-        }}
-        h1 {{
+        }
+        h1 {
             color: #333;
             font-size: 3em;
             margin-bottom: 20px;
-        }}
-        p {{
+        }
+        p {
             color: #666;
             font-size: 1.5em;
-        }}
-        .timestamp {{
+        }
+        .timestamp {
             color: #999;
             font-size: 0.9em;
             margin-top: 30px;
-        }}
+        }
     </style>
 </head>
 <body>
     <div class="container">
-        <h1>{message}</h1>
+        <h1>$message</h1>
         <p>これはMCPサーバーで生成されたHello Worldページです</p>
         <div class="timestamp">
-            生成日時: {datetime.datetime.now().strftime('%Y年%m月%d日 %H:%M:%S')}
+            生成日時: $timestamp
         </div>
     </div>
 </body>
-</html>"""
+</html>""")
+
+# ツール定義は静的なので起動時に一度だけ構築する
+_TOOLS = [
+    Tool(
+        name="get_hello_world",
+        description="WebからHello Worldを取得して表示します",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "url": {
+                    "type": "string",
+                    "description": "Hello Worldを表示するWebページのURL（省略可）",
+                    "default": "https://example.com"
+                },
+                "urls": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "複数のURLを並列に取得する場合のURLリスト（省略可、指定時はurlより優先）"
+                }
+            },
+            "required": []
+        }
+    ),
+    Tool(
+        name="create_hello_world_page",
+        description="Hello Worldを表示する簡単なHTMLページを作成します",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "title": {
+                    "type": "string",
+                    "description": "ページのタイトル",
+                    "default": "Hello World Page"
+                },
+                "message": {
+                    "type": "string",
+                    "description": "表示するメッセージ",
+                    "default": "Hello World!"
+                }
+            },
+            "required": []
+        }
+    )
+]
+
+@app.list_tools()
+async def list_tools() -> list[Tool]:
+    return _TOOLS
+
+def _dumps(result: dict) -> str:
+    """結果をJSON文字列に変換（orjsonがあれば使用、既定はコンパクト出力）"""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if _JSON_PRETTY else 0
+        return orjson.dumps(result, option=option).decode()
+    if _JSON_PRETTY:
+        return json.dumps(result, ensure_ascii=False, indent=2)
+    return json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+
+def _get_http_client() -> httpx.AsyncClient:
+    """共有HTTPクライアントを返す（初回呼び出し時に作成し、以降は接続を再利用）"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            timeout=10.0,
+            limits=httpx.Limits(
+                max_keepalive_connections=10, max_connections=20, keepalive_expiry=30
+            ),
+        )
+    return _http_client
+
+async def _fetch(client: httpx.AsyncClient, url: str) -> tuple[int, str, bool]:
+    """ページを先頭から読み、Hello/Worldが見つかった時点で打ち切る（最大 _SCAN_LIMIT バイト）
+
+    戻り値は (ステータスコード, プレビュー用の先頭テキスト, 検出結果)。
+    """
+    async with client.stream("GET", url) as response:
+        response.raise_for_status()
+        # 未知のcharsetラベルはhttpx側で既定のutf-8にフォールバックされる
+        encoding = response.encoding
+        buf = bytearray()
+        found = False
+        async for chunk in response.aiter_bytes(8192):
+            # チャンク境界をまたぐマッチに備えて直前の数バイトから走査する
+            scan_from = max(0, len(buf) - _MATCH_OVERLAP)
+            buf += chunk
+            if not found:
+                found = _HELLO_RE.search(buf, scan_from, _SCAN_LIMIT) is not None
+            if len(buf) >= _SCAN_LIMIT or (found and len(buf) >= _PREVIEW_BYTES):
+                break
+        # プレビューに必要な先頭部分だけをデコードする
+        head = buf[:_PREVIEW_BYTES].decode(encoding, errors="ignore")
+        return response.status_code, head, found
+
+def _summarize(url: str, fetched) -> dict:
+    """取得結果（(status_code, head, found) または例外）を結果dictにまとめる"""
+    if isinstance(fetched, BaseException):
+        return {
+            "success": False,
+            "url": url,
+            "error": str(fetched),
+            "message": "ページの取得に失敗しました"
+        }
+
+    # ページからHello Worldを探す
+    status_code, head, found = fetched
+    content_preview = f"{head[:500]}..." if len(head) > 500 else head
+    if found:
+        message = "ページからHello World関連のコンテンツが見つかりました"
+    else:
+        message = "ページを取得しましたが、Hello Worldは見つかりませんでした"
+    return {
+        "success": True,
+        "url": url,
+        "status_code": status_code,
+        "content_preview": content_preview,
+        "message": message
+    }
+
+@app.call_tool()
+async def call_tool(name: str, arguments: dict) -> list[TextContent]:
+    if name == "get_hello_world":
+        urls = arguments.get("urls")
+        if isinstance(urls, str):
+            # 文字列で渡された場合は1件のURLリストとして扱う（1文字ずつ取得しない）
+            urls = [urls] if urls else None
+        elif urls is not None and not isinstance(urls, list):
+            raise ValueError("urls must be an array of URL strings")
+        targets = urls if urls else [arguments.get("url", "https://example.com")]
+
+        # 複数URLは共有クライアントで並列に取得する
+        client = _get_http_client()
+        fetched = await asyncio.gather(
+            *(_fetch(client, u) for u in targets), return_exceptions=True
+        )
+        results = [_summarize(u, f) for u, f in zip(targets, fetched)]
+        result = {"results": results} if urls else results[0]
+
+        return [TextContent(type="text", text=_dumps(result))]
+    
+    elif name == "create_hello_world_page":
+        title = arguments.get("title", "Hello World Page")
+        message = arguments.get("message", "Hello World!")
+        
+        html_content = _HTML_TEMPLATE.substitute(
+            title=title,
+            message=message,
+            timestamp=datetime.datetime.now().strftime("%Y年%m月%d日 %H:%M:%S"),
+        )
         
         result = {
             "success": True,
@@ -150,13 +238,17 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
             "instructions": "このHTMLをファイルに保存してブラウザで開くと、Hello Worldページが表示されます"
         }
         
-        return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False, indent=2))]
+        return [TextContent(type="text", text=_dumps(result))]
     
     raise ValueError(f"Unknown tool: {name}")
 
 async def main():
-    async with stdio_server() as (read, write):
-        await app.run(read, write, app.create_initialization_options())
+    try:
+        async with stdio_server() as (read, write):
+            await app.run(read, write, app.create_initialization_options())
+    finally:
+        if _http_client is not None:
+            await _http_client.aclose()
 
 if __name__ == "__main__":
     asyncio.run(main())
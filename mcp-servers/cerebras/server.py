@@ -8,7 +8,6 @@ so this server only exposes `think` (no `think_with_tools`).
 """
 
 import asyncio
-import json
 import os
 import sys
 
@@ -21,6 +20,7 @@ from common.llm_provider import (
     ProviderConfig,
     THINK_INPUT_SCHEMA,
     handle_think,
+    json_dumps,
     run_server,
 )
 from mcp.server import Server
@@ -38,6 +38,7 @@ config = ProviderConfig(
         "CEREBRAS_API_URL", "http://127.0.0.1:8082/v1/chat/completions"
     ),
     request_timeout=int(os.environ.get("CEREBRAS_TIMEOUT_SECS", "120")),
+    max_inflight=int(os.environ.get("CLOTO_LLM_MAX_INFLIGHT", "16")),
     supports_tools=False,
     display_name="Cerebras",
 )
@@ -49,18 +50,22 @@ config = ProviderConfig(
 server = Server("cloto-mcp-cerebras")
 
 
+# Tool definitions are static; build them once at import.
+_TOOLS = [
+    Tool(
+        name="think",
+        description=(
+            "Generate a text response using Cerebras LLM. "
+            "Ultra-high-speed inference. No tool-calling support."
+        ),
+        inputSchema=THINK_INPUT_SCHEMA,
+    ),
+]
+
+
 @server.list_tools()
 async def list_tools() -> list[Tool]:
-    return [
-        Tool(
-            name="think",
-            description=(
-                "Generate a text response using Cerebras LLM. "
-                "Ultra-high-speed inference. No tool-calling support."
-            ),
-            inputSchema=THINK_INPUT_SCHEMA,
-        ),
-    ]
+    return _TOOLS
 
 
 @server.call_tool()
@@ -71,7 +76,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         return [
             TextContent(
                 type="text",
-                text=json.dumps({"error": f"Unknown tool: {name}"}),
+                text=json_dumps({"error": f"Unknown tool: {name}"}),
             )
         ]
 
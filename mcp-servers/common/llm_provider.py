@@ -10,6 +10,8 @@ Provides:
 - Common MCP tool definitions and handlers
 """
 
+import asyncio
+import functools
 import json
 from dataclasses import dataclass
 
@@ -18,6 +20,33 @@ from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import TextContent
 
+try:
+    import orjson
+except ImportError:  # optional speedup: pip install orjson
+    orjson = None
+
+
+# ============================================================
+# JSON Helpers
+# ============================================================
+
+
+def json_dumps(obj) -> str:
+    """Serialize obj to a JSON string, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+def json_loads(data: str | bytes):
+    """Parse a JSON document, using orjson when available.
+
+    Raises json.JSONDecodeError on invalid input (orjson's error subclasses it).
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 # ============================================================
 # Provider Configuration
@@ -34,6 +63,7 @@ class ProviderConfig:
     request_timeout: int = 120
     supports_tools: bool = True
     display_name: str = ""
+    max_inflight: int = 16
 
     def __post_init__(self):
         if not self.display_name:
@@ -56,71 +86,123 @@ def model_supports_tools(config: ProviderConfig) -> bool:
     return "reasoner" not in config.model_id
 
 
+# Agent-independent system prompt prefix. It comes first so every agent's
+# prompt shares a byte-identical prefix and provider-side prompt caching
+# (automatic prefix matching on DeepSeek/OpenAI-compatible APIs) can hit.
+_PROMPT_STATIC = (
+    "You are an AI agent running on the Cloto platform.\n"
+    "Cloto is a local, self-hosted AI container system — all data stays on your "
+    "operator's hardware and is never sent to any external service.\n"
+    "You can extend your capabilities at runtime using the create_mcp_server tool "
+    "to build new Python-based MCP tools when your current toolset is insufficient.\n"
+    "\n"
+    "IMPORTANT: You must never fabricate or hallucinate information about your "
+    "own capabilities, connected servers, or available tools. If you are unsure "
+    "about what you can do, say so honestly. Only describe capabilities you have "
+    "actually been provided with.\n"
+    "\n"
+)
+_PROMPT_NAME = "Your name is "
+_PROMPT_MEMORY = (
+    "You have persistent memory — you can recall past conversations with your operator.\n"
+)
+
+
 def build_system_prompt(agent: dict) -> str:
     """Build the system prompt for a Cloto agent.
 
-    Ported from llm::build_system_prompt().
+    Ported from llm::build_system_prompt(); the static platform text leads and
+    the agent's name, memory line and description follow it.
     """
     name = agent.get("name", "Agent")
     description = agent.get("description", "")
     metadata = agent.get("metadata", {})
-
     has_memory = bool(metadata.get("preferred_memory", ""))
-    memory_line = (
-        "You have persistent memory — you can recall past conversations with your operator.\n"
-        if has_memory
-        else ""
-    )
-
-    return (
-        f"You are {name}, an AI agent running on the Cloto platform.\n"
-        f"Cloto is a local, self-hosted AI container system — all data stays on your "
-        f"operator's hardware and is never sent to any external service.\n"
-        f"{memory_line}"
-        f"You can extend your capabilities at runtime using the create_mcp_server tool "
-        f"to build new Python-based MCP tools when your current toolset is insufficient.\n"
-        f"\n"
-        f"IMPORTANT: You must never fabricate or hallucinate information about your "
-        f"own capabilities, connected servers, or available tools. If you are unsure "
-        f"about what you can do, say so honestly. Only describe capabilities you have "
-        f"actually been provided with.\n"
-        f"\n"
-        f"{description}"
-    )
+    return _system_prompt_cached(str(name), str(description), has_memory)
+
+
+@functools.lru_cache(maxsize=256)
+def _system_prompt_cached(name: str, description: str, has_memory: bool) -> str:
+    """Assemble the system prompt; memoized because agents rarely change.
+
+    Keep per-request data (timestamps, session IDs) out of the prompt so the
+    prefix stays byte-identical and upstream prompt caches can hit.
+    """
+    return "".join((
+        _PROMPT_STATIC,
+        _PROMPT_NAME,
+        name,
+        ".\n",
+        _PROMPT_MEMORY if has_memory else "",
+        description,
+    ))
+
+
+# Context message source tag -> chat role. Tags may appear as the serde
+# internally-tagged {"type": "User", ...} or legacy externally-tagged
+# {"User": {...}} formats.
+_ROLE_MAP = {
+    "User": "user",
+    "user": "user",
+    "Agent": "assistant",
+    "agent": "assistant",
+}
+
+
+def _context_role(source) -> str:
+    """Map a context message source to an OpenAI chat role."""
+    if isinstance(source, dict):
+        # Internally-tagged carries the tag in "type"; externally-tagged has
+        # it as the sole key.
+        tag = source.get("type") or next(iter(source), "")
+    else:
+        tag = source
+    return _ROLE_MAP.get(tag, "system") if isinstance(tag, str) else "system"
+
+
+def _context_message(msg: dict) -> dict:
+    """Convert a ClotoMessage context entry into a chat message."""
+    return {
+        "role": _context_role(msg.get("source") or {}),
+        "content": msg.get("content", ""),
+    }
 
 
 def build_chat_messages(
-    agent: dict, message: dict, context: list[dict]
+    agent: dict,
+    message: dict,
+    context: list[dict],
+    system_prompt: str | None = None,
 ) -> list[dict]:
     """Build the standard OpenAI-compatible messages array.
 
-    Returns [system_message, ...context_messages, user_message].
+    Returns [system_message, ...context_messages, user_message]; context
+    entries with empty content are omitted. system_prompt overrides the
+    default build_system_prompt(agent).
+
+    The output is a pure function of the inputs, so re-thinking over the same
+    history yields a byte-identical prefix for provider-side prompt caches.
+    It is always a fresh list: callers may extend it (see
+    handle_think_with_tools), so it must not be shared between calls.
     Ported from llm::build_chat_messages().
     """
-    messages = [{"role": "system", "content": build_system_prompt(agent)}]
-
-    for msg in context:
-        source = msg.get("source", {})
-        # Handle both serde internally-tagged {"type": "User", ...}
-        # and legacy externally-tagged {"User": {...}} formats
-        src_type = source.get("type", "") if isinstance(source, dict) else ""
-        if src_type in ("User",) or "User" in source or "user" in source:
-            role = "user"
-        elif src_type in ("Agent",) or "Agent" in source or "agent" in source:
-            role = "assistant"
-        else:
-            role = "system"
-        messages.append({"role": role, "content": msg.get("content", "")})
-
+    if system_prompt is None:
+        system_prompt = build_system_prompt(agent)
+    messages = [{"role": "system", "content": system_prompt}]
+    # Context entries without content only add tokens and payload; skip them.
+    messages.extend([_context_message(msg) for msg in context if msg.get("content")])
     messages.append({"role": "user", "content": message.get("content", "")})
     return messages
 
 
-def parse_chat_content(config: ProviderConfig, response_data: dict) -> str:
-    """Extract text content from a chat completions response.
+def _raise_api_error(config: ProviderConfig, response_data) -> None:
+    """Raise ValueError if response_data is a provider error payload.
 
-    Ported from llm::parse_chat_content().
+    Only called once the happy-path lookup has failed, so successful
+    responses never pay for the error-shape probes.
     """
+    if not isinstance(response_data, dict):
+        return
     label = config.display_name
 
     # Standard OpenAI error format
@@ -130,18 +212,57 @@ def parse_chat_content(config: ProviderConfig, response_data: dict) -> str:
         raise ValueError(f"{label} API Error: {msg}")
 
     # Cerebras non-standard error format
-    if response_data.get("type", "").endswith("error"):
+    error_type = response_data.get("type", "")
+    if isinstance(error_type, str) and error_type.endswith("error"):
         msg = response_data.get("message", "Unknown error")
         raise ValueError(f"{label} API Error: {msg}")
 
+
+def _extract_choice(config: ProviderConfig, response_data) -> dict:
+    """Return choices[0] of a chat completions response.
+
+    Raises ValueError for provider error payloads; otherwise a missing
+    choice re-raises the lookup error so each parser keeps its own message.
+    """
+    try:
+        return response_data["choices"][0]
+    except (KeyError, IndexError, TypeError):
+        _raise_api_error(config, response_data)
+        raise
+
+
+def parse_chat_content(config: ProviderConfig, response_data: dict) -> str:
+    """Extract text content from a chat completions response.
+
+    Ported from llm::parse_chat_content().
+    """
     try:
-        return response_data["choices"][0]["message"]["content"]
+        return _extract_choice(config, response_data)["message"]["content"]
     except (KeyError, IndexError, TypeError) as e:
         raise ValueError(
-            f"Invalid {label} API response: missing choices[0].message.content: {e}"
+            f"Invalid {config.display_name} API response: "
+            f"missing choices[0].message.content: {e}"
         ) from e
 
 
+def _parse_tool_arguments(raw) -> dict:
+    """Decode a tool call's arguments into a dict.
+
+    The kernel forwards arguments to the tool as a JSON object, so they must
+    be decoded here. Empty payloads and providers that already send an object
+    skip the JSON parse.
+    """
+    if isinstance(raw, dict):
+        return raw
+    if not raw or raw == "{}":
+        return {}
+    try:
+        arguments = json_loads(raw)
+    except (json.JSONDecodeError, TypeError):
+        return {}
+    return arguments if isinstance(arguments, dict) else {}
+
+
 def parse_chat_think_result(config: ProviderConfig, response_data: dict) -> dict:
     """Parse a chat completions response into a ThinkResult.
 
@@ -152,44 +273,25 @@ def parse_chat_think_result(config: ProviderConfig, response_data: dict) -> dict
 
     Ported from llm::parse_chat_think_result().
     """
-    label = config.display_name
-
-    # Standard OpenAI error format
-    if "error" in response_data:
-        error = response_data["error"]
-        msg = error.get("message", str(error)) if isinstance(error, dict) else str(error)
-        raise ValueError(f"{label} API Error: {msg}")
-
-    # Cerebras non-standard error format
-    if response_data.get("type", "").endswith("error"):
-        msg = response_data.get("message", "Unknown error")
-        raise ValueError(f"{label} API Error: {msg}")
-
     try:
-        choice = response_data["choices"][0]
+        choice = _extract_choice(config, response_data)
     except (KeyError, IndexError, TypeError) as e:
         raise ValueError(f"Invalid API response: missing choices[0]: {e}") from e
-
-    message_obj = choice.get("message", {})
-    finish_reason = choice.get("finish_reason", "stop")
-
-    if finish_reason == "tool_calls" or "tool_calls" in message_obj:
-        tool_calls_arr = message_obj.get("tool_calls", [])
-        calls = []
-        for tc in tool_calls_arr:
-            tc_id = tc.get("id", "")
-            function = tc.get("function", {})
-            name = function.get("name", "")
-            arguments_str = function.get("arguments", "{}")
-            try:
-                arguments = json.loads(arguments_str)
-            except json.JSONDecodeError:
-                arguments = {}
-
-            if tc_id and name:
-                calls.append(
-                    {"id": tc_id, "name": name, "arguments": arguments}
-                )
+    message_obj = choice.get("message") or {}
+
+    tool_calls_arr = message_obj.get("tool_calls")
+    if tool_calls_arr:
+        # Calls without an id or function name are dropped before their
+        # arguments are decoded.
+        calls = [
+            {
+                "id": tc["id"],
+                "name": function["name"],
+                "arguments": _parse_tool_arguments(function.get("arguments")),
+            }
+            for tc in tool_calls_arr
+            if tc.get("id") and (function := tc.get("function") or {}).get("name")
+        ]
 
         if calls:
             return {
@@ -198,16 +300,50 @@ def parse_chat_think_result(config: ProviderConfig, response_data: dict) -> dict
                 "calls": calls,
             }
 
-    content = message_obj.get("content", "")
-    if content is None:
-        content = ""
-    return {"type": "final", "content": content}
+    return {"type": "final", "content": message_obj.get("content") or ""}
 
 
 # ============================================================
 # LLM API Call
 # ============================================================
 
+# Shared HTTP client, created lazily inside the running event loop so that
+# repeated think calls reuse pooled keep-alive connections to the proxy.
+_client: httpx.AsyncClient | None = None
+
+# Bounds concurrent requests to the proxy; sized to match the keep-alive pool.
+_inflight: asyncio.Semaphore | None = None
+
+
+def get_client(config: ProviderConfig) -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=config.request_timeout,
+            limits=httpx.Limits(
+                max_keepalive_connections=config.max_inflight,
+                keepalive_expiry=30,
+            ),
+        )
+    return _client
+
+
+def _get_inflight(config: ProviderConfig) -> asyncio.Semaphore:
+    """Return the in-flight request semaphore, creating it on first use."""
+    global _inflight
+    if _inflight is None:
+        _inflight = asyncio.Semaphore(max(1, config.max_inflight))
+    return _inflight
+
+
+async def aclose_client() -> None:
+    """Close the shared HTTP client."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
 
 async def call_llm_api(
     config: ProviderConfig,
@@ -224,7 +360,8 @@ async def call_llm_api(
     if tools and model_supports_tools(config):
         body["tools"] = tools
 
-    async with httpx.AsyncClient(timeout=config.request_timeout) as client:
+    client = get_client(config)
+    async with _get_inflight(config):
         response = await client.post(
             config.api_url,
             json=body,
@@ -233,8 +370,11 @@ async def call_llm_api(
                 "Content-Type": "application/json",
             },
         )
-        response.raise_for_status()
-        return response.json()
+    response.raise_for_status()
+    # The kernel proxy returns one buffered JSON document (it re-serializes the
+    # upstream body), so SSE streaming is not available; parse the raw bytes
+    # directly to skip httpx's text decoding.
+    return json_loads(response.content)
 
 
 # ============================================================
@@ -318,13 +458,13 @@ async def handle_think(
 
         return [
             TextContent(
-                type="text", text=json.dumps({"type": "final", "content": content})
+                type="text", text=json_dumps({"type": "final", "content": content})
             )
         ]
     except Exception as e:
         return [
             TextContent(
-                type="text", text=json.dumps({"error": str(e)})
+                type="text", text=json_dumps({"error": str(e)})
             )
         ]
 
@@ -347,11 +487,11 @@ async def handle_think_with_tools(
         response_data = await call_llm_api(config, messages, tools)
         result = parse_chat_think_result(config, response_data)
 
-        return [TextContent(type="text", text=json.dumps(result))]
+        return [TextContent(type="text", text=json_dumps(result))]
     except Exception as e:
         return [
             TextContent(
-                type="text", text=json.dumps({"error": str(e)})
+                type="text", text=json_dumps({"error": str(e)})
             )
         ]
 
@@ -363,7 +503,10 @@ async def handle_think_with_tools(
 
 async def run_server(server: Server):
     """Run an MCP server using stdio transport."""
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream, write_stream, server.create_initialization_options()
-        )
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream, write_stream, server.create_initialization_options()
+            )
+    finally:
+        await aclose_client()
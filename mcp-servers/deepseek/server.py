@@ -5,7 +5,6 @@ Ported from plugins/deepseek/src/lib.rs + crates/shared/src/llm.rs
 """
 
 import asyncio
-import json
 import os
 import sys
 
@@ -21,6 +20,7 @@ from common.llm_provider import (
     handle_think,
     handle_think_with_tools,
     model_supports_tools,
+    json_dumps,
     run_server,
 )
 from mcp.server import Server
@@ -39,6 +39,7 @@ config = ProviderConfig(
         "DEEPSEEK_API_URL", "http://127.0.0.1:8082/v1/chat/completions"
     ),
     request_timeout=int(os.environ.get("DEEPSEEK_TIMEOUT_SECS", "120")),
+    max_inflight=int(os.environ.get("CLOTO_LLM_MAX_INFLIGHT", "16")),
     supports_tools=True,
     display_name="DeepSeek",
 )
@@ -50,32 +51,34 @@ config = ProviderConfig(
 server = Server("cloto-mcp-deepseek")
 
 
-@server.list_tools()
-async def list_tools() -> list[Tool]:
-    tools = [
+# Tool definitions depend only on the (static) config; build them once at import.
+_TOOLS = [
+    Tool(
+        name="think",
+        description=(
+            "Generate a text response using DeepSeek LLM. "
+            "Use this for simple text generation without tool support."
+        ),
+        inputSchema=THINK_INPUT_SCHEMA,
+    ),
+]
+
+if model_supports_tools(config):
+    _TOOLS.append(
         Tool(
-            name="think",
+            name="think_with_tools",
             description=(
-                "Generate a text response using DeepSeek LLM. "
-                "Use this for simple text generation without tool support."
+                "Generate a response that may include tool calls. "
+                "Returns either final text or a list of tool calls to execute."
             ),
-            inputSchema=THINK_INPUT_SCHEMA,
-        ),
-    ]
-
-    if model_supports_tools(config):
-        tools.append(
-            Tool(
-                name="think_with_tools",
-                description=(
-                    "Generate a response that may include tool calls. "
-                    "Returns either final text or a list of tool calls to execute."
-                ),
-                inputSchema=THINK_WITH_TOOLS_INPUT_SCHEMA,
-            )
+            inputSchema=THINK_WITH_TOOLS_INPUT_SCHEMA,
         )
+    )
+
 
-    return tools
+@server.list_tools()
+async def list_tools() -> list[Tool]:
+    return _TOOLS
 
 
 @server.call_tool()
@@ -88,7 +91,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         return [
             TextContent(
                 type="text",
-                text=json.dumps({"error": f"Unknown tool: {name}"}),
+                text=json_dumps({"error": f"Unknown tool: {name}"}),
             )
         ]
 
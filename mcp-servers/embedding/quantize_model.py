@@ -0,0 +1,50 @@
+"""
+Cloto MCP Embedding: INT8 model quantization
+Produces model_int8.onnx next to model.onnx using ONNX Runtime dynamic
+quantization. The onnx_miniml provider prefers the INT8 model on CPU
+(disable with ONNX_PREFER_INT8=false).
+
+Usage: python mcp-servers/embedding/quantize_model.py [MODEL_DIR]
+MODEL_DIR defaults to $ONNX_MODEL_DIR or data/models/all-MiniLM-L6-v2.
+"""
+
+import os
+import sys
+
+
+def quantize(model_dir: str) -> str:
+    """Quantize model.onnx in model_dir to INT8 weights; returns output path."""
+    try:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+    except ImportError:
+        raise ImportError(
+            "Quantization requires: pip install onnxruntime onnx\n"
+            "Or: pip install cloto-mcp-embedding[onnx] onnx"
+        )
+
+    model_path = os.path.join(model_dir, "model.onnx")
+    output_path = os.path.join(model_dir, "model_int8.onnx")
+
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"ONNX model not found at {model_path}")
+
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QInt8)
+    return output_path
+
+
+def main() -> None:
+    model_dir = (
+        sys.argv[1]
+        if len(sys.argv) > 1
+        else os.environ.get("ONNX_MODEL_DIR", "data/models/all-MiniLM-L6-v2")
+    )
+    output_path = quantize(model_dir)
+    print(
+        f"Quantized model written to {output_path} "
+        f"({os.path.getsize(output_path)} bytes)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,14 @@ Design: docs/KS22_MEMORY_DESIGN.md Section 5
 """
 
 import asyncio
+import hashlib
+import importlib.util
 import json
 import logging
 import os
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import httpx
 import numpy as np
@@ -19,6 +23,19 @@ from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import TextContent, Tool
 
+try:
+    import orjson
+except ImportError:  # optional speedup: pip install cloto-mcp-embedding[speedups]
+    orjson = None
+
+try:
+    from numba import njit
+except ImportError:  # optional speedup: pip install cloto-mcp-embedding[jit]
+    njit = None
+
+# HTTP/2 needs the optional h2 package: pip install cloto-mcp-embedding[http2]
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
 logger = logging.getLogger(__name__)
 
 # ============================================================
@@ -33,11 +50,117 @@ EMBEDDING_API_URL = os.environ.get(
 )
 EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "")  # provider-dependent default
 EMBEDDING_TIMEOUT = int(os.environ.get("EMBEDDING_TIMEOUT_SECS", "30"))
+# In-process LRU of computed embeddings (entries); 0 disables the cache
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "4096"))
 
 # ONNX-specific
 ONNX_MODEL_DIR = os.environ.get(
     "ONNX_MODEL_DIR", "data/models/all-MiniLM-L6-v2"
 )
+ONNX_MAX_SEQ_LEN = 128  # tokenizer truncates every input to this length
+# Batches are padded to their longest input, rounded up to this multiple, so
+# short texts skip attention over padding while distinct shapes stay few
+ONNX_PAD_MULTIPLE = 8
+# Prefer model_int8.onnx (see quantize_model.py) when running on CPU
+ONNX_PREFER_INT8 = os.environ.get("ONNX_PREFER_INT8", "true").lower() == "true"
+# Concurrent inference threads on the CPU provider (DirectML always uses 1)
+ONNX_EMBED_WORKERS = int(os.environ.get("ONNX_EMBED_WORKERS", "4"))
+# Threads used inside each ONNX operator; 0 = min(8, CPU count)
+ONNX_INTRA_OP_THREADS = int(os.environ.get("ONNX_INTRA_OP_THREADS", "0"))
+
+# ============================================================
+# JSON Helpers
+# ============================================================
+
+
+def _json_default(obj):
+    """Convert NumPy values for the stdlib encoder."""
+    if isinstance(obj, (np.ndarray, np.generic)):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def json_dumps(obj) -> str:
+    """Serialize obj to a JSON string, using orjson when available.
+
+    Embedding batches are large float arrays, where orjson is several times
+    faster than the stdlib encoder. NumPy arrays are serialized directly,
+    without first materializing Python float lists.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    return json.dumps(obj, default=_json_default)
+
+
+def json_dumpb(obj) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes (for HTTP bodies)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, default=_json_default).encode()
+
+
+def json_loads(data: str | bytes):
+    """Parse a JSON document, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# ============================================================
+# Pooling Kernels
+# ============================================================
+
+
+def _pool_normalize_numpy(
+    token_embeddings: np.ndarray, attention_mask: np.ndarray
+) -> np.ndarray:
+    """Masked mean pooling + L2 normalization: (B, S, D) -> (B, D) float32."""
+    # einsum contracts the mask into the sum directly, so no (B, S, D)
+    # temporary is built; the divisions then run in place on the result.
+    mask = attention_mask.astype(np.float32)
+    pooled = np.einsum("bsd,bs->bd", token_embeddings, mask)
+    counts = mask.sum(axis=1, keepdims=True)
+    np.clip(counts, 1e-9, None, out=counts)
+    pooled /= counts
+
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    np.clip(norms, 1e-9, None, out=norms)
+    pooled /= norms
+    return pooled
+
+
+if njit is not None:
+
+    # Serial on purpose: batches already run concurrently on the embed
+    # executor, and numba's default workqueue threading layer must not be
+    # entered from several threads at once.
+    @njit(fastmath=True, cache=True)
+    def _pool_normalize_jit(token_embeddings, attention_mask):
+        """Numba version of _pool_normalize_numpy: one fused pass per row."""
+        batch, seq_len, dim = token_embeddings.shape
+        pooled = np.zeros((batch, dim), dtype=np.float32)
+        for b in range(batch):
+            count = 0.0
+            for s in range(seq_len):
+                if attention_mask[b, s]:
+                    count += 1.0
+                    for d in range(dim):
+                        pooled[b, d] += token_embeddings[b, s, d]
+            count = max(count, 1e-9)
+            sq_sum = 0.0
+            for d in range(dim):
+                v = pooled[b, d] / count
+                pooled[b, d] = v
+                sq_sum += v * v
+            norm = max(np.sqrt(sq_sum), 1e-9)
+            for d in range(dim):
+                pooled[b, d] /= norm
+        return pooled
+
+    pool_normalize = _pool_normalize_jit
+else:
+    pool_normalize = _pool_normalize_numpy
+
 
 # ============================================================
 # Provider Abstraction
@@ -52,8 +175,8 @@ class EmbeddingProvider(ABC):
         """Initialize the provider (load model, create client, etc.)."""
 
     @abstractmethod
-    async def embed(self, texts: list[str]) -> list[list[float]]:
-        """Generate embeddings for a batch of texts."""
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        """Generate L2-normalized embeddings as a (batch, dim) float32 array."""
 
     @abstractmethod
     def dimensions(self) -> int:
@@ -84,13 +207,23 @@ class OpenAIEmbeddingProvider(EmbeddingProvider):
             raise ValueError(
                 "EMBEDDING_API_KEY is required for api_openai provider"
             )
-        self._client = httpx.AsyncClient(timeout=self._timeout)
+        # HTTP/2 (negotiated via ALPN) multiplexes concurrent batches over one
+        # TLS connection instead of queueing them on HTTP/1.1 keep-alives
+        self._client = httpx.AsyncClient(
+            timeout=self._timeout,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_keepalive_connections=16,
+                max_connections=64,
+                keepalive_expiry=300.0,
+            ),
+        )
         logger.info(
-            "OpenAI embedding provider initialized (model=%s, url=%s)",
-            self._model, self._api_url,
+            "OpenAI embedding provider initialized (model=%s, url=%s, http2=%s)",
+            self._model, self._api_url, HTTP2_AVAILABLE,
         )
 
-    async def embed(self, texts: list[str]) -> list[list[float]]:
+    async def embed(self, texts: list[str]) -> np.ndarray:
         if not self._client:
             raise RuntimeError("Provider not initialized")
 
@@ -104,23 +237,23 @@ class OpenAIEmbeddingProvider(EmbeddingProvider):
         )
         response.raise_for_status()
 
-        data = response.json()
+        # Parse the UTF-8 body directly; skips httpx's str decode step
+        data = json_loads(response.content)
         embeddings = [item["embedding"] for item in data["data"]]
+        if not embeddings:
+            return np.empty((0, self._dimensions), dtype=np.float32)
+
+        arr = np.asarray(embeddings, dtype=np.float32)
 
         # Update dimensions from actual response
-        if embeddings:
-            self._dimensions = len(embeddings[0])
+        self._dimensions = arr.shape[1]
 
         # L2-normalize for consistent cosine similarity via dot product
-        result = []
-        for emb in embeddings:
-            vec = np.array(emb, dtype=np.float32)
-            norm = np.linalg.norm(vec)
-            if norm > 1e-9:
-                vec = vec / norm
-            result.append(vec.tolist())
+        norms = np.linalg.norm(arr, axis=1, keepdims=True)
+        np.clip(norms, 1e-9, None, out=norms)
+        arr /= norms
 
-        return result
+        return arr
 
     def dimensions(self) -> int:
         return self._dimensions
@@ -143,7 +276,8 @@ class OnnxMiniLMProvider(EmbeddingProvider):
         self._model_dir = model_dir
         self._session = None
         self._tokenizer = None
-        self._lock = asyncio.Lock()
+        self._encode_batch = None
+        self._executor: ThreadPoolExecutor | None = None
 
     async def initialize(self) -> None:
         try:
@@ -181,35 +315,90 @@ class OnnxMiniLMProvider(EmbeddingProvider):
             pass
         providers.append("CPUExecutionProvider")
 
-        self._session = ort.InferenceSession(model_path, providers=providers)
+        # Dynamic INT8 quantization targets CPU kernels; keep FP32 for DirectML
+        int8_path = os.path.join(self._model_dir, "model_int8.onnx")
+        if (
+            ONNX_PREFER_INT8
+            and "DmlExecutionProvider" not in providers
+            and os.path.exists(int8_path)
+        ):
+            model_path = int8_path
+            logger.info("Using INT8-quantized ONNX model")
+
+        sess_options = ort.SessionOptions()
+        sess_options.graph_optimization_level = (
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        # MiniLM is a single linear chain of ops: parallelism comes from
+        # inside each operator, not from running branches side by side
+        sess_options.intra_op_num_threads = (
+            ONNX_INTRA_OP_THREADS or min(8, os.cpu_count() or 4)
+        )
+        sess_options.inter_op_num_threads = 1
+        sess_options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        # Memory patterns pre-plan CPU buffers; DirectML requires them off
+        sess_options.enable_mem_pattern = providers == ["CPUExecutionProvider"]
+        sess_options.enable_cpu_mem_arena = True
+        # Requests arrive in bursts; don't let idle pool threads spin on CPU
+        sess_options.add_session_config_entry(
+            "session.intra_op.allow_spinning", "0"
+        )
+
+        self._session = ort.InferenceSession(
+            model_path, sess_options=sess_options, providers=providers
+        )
         self._tokenizer = Tokenizer.from_file(tokenizer_path)
-        self._tokenizer.enable_padding(pad_id=0, pad_token="[PAD]", length=128)
-        self._tokenizer.enable_truncation(max_length=128)
+        # Dedicated pool so inference neither serializes behind a lock nor
+        # competes with other blocking work on the default executor. DirectML
+        # does not support concurrent Run() calls on one session, so it gets
+        # a single worker; only the CPU provider runs batches in parallel.
+        workers = max(1, ONNX_EMBED_WORKERS)
+        if "DmlExecutionProvider" in providers:
+            workers = 1
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="onnx-embed",
+        )
+        self._tokenizer.enable_padding(
+            pad_id=0, pad_token="[PAD]", pad_to_multiple_of=ONNX_PAD_MULTIPLE
+        )
+        self._tokenizer.enable_truncation(max_length=ONNX_MAX_SEQ_LEN)
+        # encode_batch_fast (tokenizers >= 0.20) skips offset tracking we never use
+        self._encode_batch = getattr(
+            self._tokenizer, "encode_batch_fast", self._tokenizer.encode_batch
+        )
+
+        if njit is not None:
+            # Compile (or load the cached) pooling kernel before the first request
+            await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._embed_sync, [""]
+            )
 
         logger.info(
-            "ONNX MiniLM provider initialized (dir=%s, providers=%s)",
-            self._model_dir, providers,
+            "ONNX MiniLM provider initialized (model=%s, providers=%s, jit=%s)",
+            model_path, providers, njit is not None,
         )
 
-    async def embed(self, texts: list[str]) -> list[list[float]]:
+    async def embed(self, texts: list[str]) -> np.ndarray:
         if not self._session or not self._tokenizer:
             raise RuntimeError("Provider not initialized")
 
-        async with self._lock:
-            return await asyncio.get_event_loop().run_in_executor(
-                None, self._embed_sync, texts
-            )
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._embed_sync, texts
+        )
 
-    def _embed_sync(self, texts: list[str]) -> list[list[float]]:
+    def _embed_sync(self, texts: list[str]) -> np.ndarray:
         """Synchronous embedding (run in executor to avoid blocking)."""
-        encodings = self._tokenizer.encode_batch(texts)
+        encodings = self._encode_batch(texts)
 
-        input_ids = np.array(
-            [e.ids for e in encodings], dtype=np.int64
-        )
-        attention_mask = np.array(
-            [e.attention_mask for e in encodings], dtype=np.int64
-        )
+        # Fill preallocated arrays row by row instead of building nested lists;
+        # every encoding in the batch is padded to the same length
+        seq_len = len(encodings[0].ids)
+        input_ids = np.empty((len(encodings), seq_len), dtype=np.int64)
+        attention_mask = np.empty_like(input_ids)
+        for i, e in enumerate(encodings):
+            input_ids[i] = e.ids
+            attention_mask[i] = e.attention_mask
 
         outputs = self._session.run(
             None,
@@ -217,28 +406,18 @@ class OnnxMiniLMProvider(EmbeddingProvider):
         )
         token_embeddings = outputs[0]  # (batch, seq_len, hidden_dim)
 
-        # Mean pooling + L2 normalization
-        mask_expanded = np.expand_dims(attention_mask, -1).astype(np.float32)
-        sum_embeddings = np.sum(
-            token_embeddings * mask_expanded, axis=1
-        )
-        sum_mask = np.clip(
-            np.sum(mask_expanded, axis=1), a_min=1e-9, a_max=None
-        )
-        mean_pooled = sum_embeddings / sum_mask
-
-        norms = np.linalg.norm(mean_pooled, axis=1, keepdims=True)
-        norms = np.clip(norms, a_min=1e-9, a_max=None)
-        normalized = mean_pooled / norms
-
-        return normalized.tolist()
+        return pool_normalize(token_embeddings, attention_mask)
 
     def dimensions(self) -> int:
         return 384
 
     async def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
         self._session = None
         self._tokenizer = None
+        self._encode_batch = None
 
 
 # ============================================================
@@ -264,50 +443,113 @@ def create_provider() -> EmbeddingProvider:
         )
 
 
+# ============================================================
+# Embedding Cache
+# ============================================================
+
+
+class EmbeddingCache:
+    """Bounded LRU of embedding rows keyed by a BLAKE2b digest of the text.
+
+    Memory recall re-embeds the same queries and utterances repeatedly; hits
+    skip an ONNX forward pass or an API round trip. Duplicate texts within a
+    batch are collapsed first, only misses reach the provider, and results
+    are scattered back in input order.
+    """
+
+    def __init__(self, max_entries: int):
+        self._max_entries = max_entries
+        self._rows: OrderedDict[bytes, np.ndarray] = OrderedDict()
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    async def embed(self, provider: EmbeddingProvider, texts: list[str]) -> np.ndarray:
+        unique: dict[str, int] = {}
+        order = [unique.setdefault(t, len(unique)) for t in texts]
+        rows = await self._embed_unique(provider, list(unique))
+        return rows if len(unique) == len(texts) else rows[order]
+
+    async def _embed_unique(
+        self, provider: EmbeddingProvider, texts: list[str]
+    ) -> np.ndarray:
+        if self._max_entries <= 0:
+            return await provider.embed(texts)
+
+        keys = [self._key(t) for t in texts]
+        rows = [self._rows.get(k) for k in keys]
+        misses = [i for i, row in enumerate(rows) if row is None]
+
+        for i, row in enumerate(rows):
+            if row is not None:
+                self._rows.move_to_end(keys[i])
+
+        if misses:
+            fresh = await provider.embed([texts[i] for i in misses])
+            for j, i in enumerate(misses):
+                # Copy so a cached row does not pin the whole batch array
+                row = fresh[j].copy()
+                rows[i] = row
+                self._rows[keys[i]] = row
+            while len(self._rows) > self._max_entries:
+                self._rows.popitem(last=False)
+
+        return np.stack(rows)
+
+
 # ============================================================
 # HTTP Endpoint (for KS22 inter-server communication)
 # ============================================================
 
 _provider: EmbeddingProvider | None = None
+_cache = EmbeddingCache(EMBEDDING_CACHE_SIZE)
+
+
+def _json_response(body: bytes, status: int = 200) -> web.Response:
+    """Wrap pre-encoded JSON bytes; skips web.json_response's str encode pass."""
+    return web.Response(body=body, status=status, content_type="application/json")
+
+
+# Static error bodies, encoded once at import
+_ERR_NOT_INITIALIZED = json_dumpb({"error": "Provider not initialized"})
+_ERR_INVALID_JSON = json_dumpb({"error": "Invalid JSON body"})
+_ERR_TEXTS = json_dumpb({"error": "'texts' must be a non-empty array of strings"})
+_ERR_BATCH_SIZE = json_dumpb({"error": "Batch size exceeds limit (max 100)"})
 
 
 async def handle_embed(request: web.Request) -> web.Response:
     """POST /embed — Generate embeddings for input texts."""
     if _provider is None:
-        return web.json_response(
-            {"error": "Provider not initialized"}, status=503
-        )
+        return _json_response(_ERR_NOT_INITIALIZED, status=503)
 
     try:
-        body = await request.json()
+        body = await request.json(loads=json_loads)
     except Exception:
-        return web.json_response(
-            {"error": "Invalid JSON body"}, status=400
-        )
+        return _json_response(_ERR_INVALID_JSON, status=400)
 
     texts = body.get("texts")
     if not isinstance(texts, list) or not texts:
-        return web.json_response(
-            {"error": "'texts' must be a non-empty array of strings"},
-            status=400,
-        )
+        return _json_response(_ERR_TEXTS, status=400)
 
     # Limit batch size to prevent OOM
     if len(texts) > 100:
-        return web.json_response(
-            {"error": "Batch size exceeds limit (max 100)"}, status=400
-        )
+        return _json_response(_ERR_BATCH_SIZE, status=400)
 
     try:
-        embeddings = await _provider.embed(texts)
-        return web.json_response({
-            "embeddings": embeddings,
-            "dimensions": _provider.dimensions(),
-        })
+        embeddings = await _cache.embed(_provider, texts)
+        return _json_response(
+            json_dumpb(
+                {
+                    "embeddings": embeddings,
+                    "dimensions": _provider.dimensions(),
+                }
+            )
+        )
     except Exception as e:
         logger.exception("Embedding failed")
-        return web.json_response(
-            {"error": f"Embedding failed: {e}"}, status=500
+        return _json_response(
+            json_dumpb({"error": f"Embedding failed: {e}"}), status=500
         )
 
 
@@ -336,25 +578,29 @@ async def run_http_server(port: int) -> None:
 mcp_server = Server("cloto-mcp-embedding")
 
 
+# Tool definitions are static; build them once at import.
+_TOOLS = [
+    Tool(
+        name="embed",
+        description="Generate vector embeddings for input texts.",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "texts": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Texts to embed (batch, max 100)",
+                }
+            },
+            "required": ["texts"],
+        },
+    ),
+]
+
+
 @mcp_server.list_tools()
 async def list_tools() -> list[Tool]:
-    return [
-        Tool(
-            name="embed",
-            description="Generate vector embeddings for input texts.",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "texts": {
-                        "type": "array",
-                        "items": {"type": "string"},
-                        "description": "Texts to embed (batch, max 100)",
-                    }
-                },
-                "required": ["texts"],
-            },
-        ),
-    ]
+    return _TOOLS
 
 
 @mcp_server.call_tool()
@@ -363,7 +609,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         return [
             TextContent(
                 type="text",
-                text=json.dumps({"error": f"Unknown tool: {name}"}),
+                text=json_dumps({"error": f"Unknown tool: {name}"}),
             )
         ]
 
@@ -371,7 +617,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         return [
             TextContent(
                 type="text",
-                text=json.dumps({"error": "Provider not initialized"}),
+                text=json_dumps({"error": "Provider not initialized"}),
             )
         ]
 
@@ -380,7 +626,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         return [
             TextContent(
                 type="text",
-                text=json.dumps(
+                text=json_dumps(
                     {"error": "'texts' must be a non-empty array"}
                 ),
             )
@@ -390,23 +636,23 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         return [
             TextContent(
                 type="text",
-                text=json.dumps(
+                text=json_dumps(
                     {"error": "Batch size exceeds limit (max 100)"}
                 ),
             )
         ]
 
     try:
-        embeddings = await _provider.embed(texts)
+        embeddings = await _cache.embed(_provider, texts)
         result = {
             "embeddings": embeddings,
             "dimensions": _provider.dimensions(),
         }
-        return [TextContent(type="text", text=json.dumps(result))]
+        return [TextContent(type="text", text=json_dumps(result))]
     except Exception as e:
         return [
             TextContent(
-                type="text", text=json.dumps({"error": str(e)})
+                type="text", text=json_dumps({"error": str(e)})
             )
         ]
 
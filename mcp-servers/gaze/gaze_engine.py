@@ -5,7 +5,10 @@ Runs camera capture and face landmark detection in a background thread.
 MCP tool handlers read the latest gaze result from shared state.
 """
 
+import hashlib
 import math
+import os
+import sys
 import threading
 import time
 from dataclasses import dataclass, field
@@ -22,6 +25,13 @@ CAMERA_WIDTH = 640
 CAMERA_HEIGHT = 480
 CAMERA_FPS = 15
 
+# Optional inference width (px): frames wider than this are downscaled before
+# MediaPipe, trading iris precision for CPU. 0 keeps the camera resolution.
+INFER_WIDTH = int(os.environ.get("GAZE_INFER_WIDTH", "0"))
+
+# Try MediaPipe's GPU delegate first; falls back to CPU if it cannot start
+USE_GPU = os.environ.get("GAZE_USE_GPU", "true").lower() == "true"
+
 # MediaPipe 478-point model landmark indices
 RIGHT_IRIS_CENTER = 468
 LEFT_IRIS_CENTER = 473
@@ -36,53 +46,47 @@ LEFT_EYE_BOTTOM = 374
 MIN_LANDMARKS_FOR_IRIS = 474
 
 FACE_CONFIDENCE_THRESHOLD = 0.5
+
+# Idle mode: once no face has been seen for ABSENT_AFTER_NS, run MediaPipe
+# only every ABSENT_INFER_EVERY frames unless the scene moves. Motion is the
+# mean absolute difference (0-255) of successive 32x32 grayscale thumbnails.
+ABSENT_AFTER_NS = 1_000_000_000
+ABSENT_INFER_EVERY = 5
+MOTION_THUMB_SIZE = (32, 32)
+MOTION_THRESHOLD = 4.0
 ZERO_DIVISION_EPSILON = 0.0001
 
 # One Euro Filter parameters (same as TypeScript version)
 ONE_EURO_MINCUTOFF = 1.0
 ONE_EURO_BETA = 0.5
 ONE_EURO_DCUTOFF = 1.0
+_TWO_PI = 2.0 * math.pi
 
 # MediaPipe model URL
 FACE_MODEL_URL = (
     "https://storage.googleapis.com/mediapipe-models/"
     "face_landmarker/face_landmarker/float16/1/face_landmarker.task"
 )
+# Downloaded models are kept here, keyed by URL hash, with a .sha256 sidecar
+MODEL_CACHE_DIR = os.environ.get(
+    "GAZE_MODEL_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "cloto")
+)
 
 
 # ============================================================
 # One Euro Filter (Casiez et al., CHI 2012)
 # ============================================================
 
-class _LowPassFilter:
-    __slots__ = ("_s", "_raw", "_initialized")
-
-    def __init__(self) -> None:
-        self._s = 0.0
-        self._raw = 0.0
-        self._initialized = False
-
-    @property
-    def has_last_raw(self) -> bool:
-        return self._initialized
-
-    @property
-    def last_raw(self) -> float:
-        return self._raw
-
-    def filter(self, value: float, alpha: float) -> float:
-        self._raw = value
-        if self._initialized:
-            self._s = alpha * value + (1.0 - alpha) * self._s
-        else:
-            self._s = value
-            self._initialized = True
-        return self._s
-
+class OneEuroFilter2D:
+    """One Euro filter over two axes sharing one clock, e.g. the x/y gaze axes.
 
-class OneEuroFilter:
-    __slots__ = ("_freq", "_mincutoff", "_beta", "_dcutoff",
-                 "_x_filt", "_dx_filt", "_last_time")
+    Each axis is filtered independently, but the rate and derivative alpha
+    are computed once per sample and both axes update in a single call.
+    Plain float slots rather than a 2-wide NumPy array: ufunc dispatch on
+    two elements costs more than the math.
+    """
+    __slots__ = ("_freq", "_mincutoff", "_beta", "_dtau", "_last_time",
+                 "_initialized", "_sx", "_sy", "_rx", "_ry", "_dx", "_dy")
 
     def __init__(
         self,
@@ -94,40 +98,50 @@ class OneEuroFilter:
         self._freq = freq
         self._mincutoff = mincutoff
         self._beta = beta
-        self._dcutoff = dcutoff
-        self._x_filt = _LowPassFilter()
-        self._dx_filt = _LowPassFilter()
+        self._dtau = 1.0 / (_TWO_PI * dcutoff)
         self._last_time = -1.0
+        self._initialized = False
+        self._sx = self._sy = 0.0  # filtered values
+        self._rx = self._ry = 0.0  # last raw values
+        self._dx = self._dy = 0.0  # filtered derivatives
 
-    def _alpha(self, cutoff: float) -> float:
-        te = 1.0 / self._freq
-        tau = 1.0 / (2.0 * math.pi * cutoff)
-        return 1.0 / (1.0 + tau / te)
-
-    def filter(self, value: float, timestamp: float) -> float:
+    def filter(self, x: float, y: float, timestamp: float) -> tuple[float, float]:
         if self._last_time >= 0:
             dt = timestamp - self._last_time
             if dt > 0:
                 self._freq = 1.0 / dt
         self._last_time = timestamp
+        self._rx, rx = x, self._rx
+        self._ry, ry = y, self._ry
+
+        if not self._initialized:
+            self._initialized = True
+            self._sx, self._sy = x, y
+            return x, y
 
-        dvalue = (
-            (value - self._x_filt.last_raw) * self._freq
-            if self._x_filt.has_last_raw
-            else 0.0
-        )
-        edvalue = self._dx_filt.filter(dvalue, self._alpha(self._dcutoff))
-        cutoff = self._mincutoff + self._beta * abs(edvalue)
-        return self._x_filt.filter(value, self._alpha(cutoff))
+        freq = self._freq
+        ad = 1.0 / (1.0 + self._dtau * freq)
+        dx = self._dx = ad * ((x - rx) * freq) + (1.0 - ad) * self._dx
+        dy = self._dy = ad * ((y - ry) * freq) + (1.0 - ad) * self._dy
+
+        ax = 1.0 / (1.0 + freq / (_TWO_PI * (self._mincutoff + self._beta * abs(dx))))
+        ay = 1.0 / (1.0 + freq / (_TWO_PI * (self._mincutoff + self._beta * abs(dy))))
+        sx = self._sx = ax * x + (1.0 - ax) * self._sx
+        sy = self._sy = ay * y + (1.0 - ay) * self._sy
+        return sx, sy
 
 
 # ============================================================
 # Gaze Result
 # ============================================================
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class GazeResult:
-    """Normalized gaze coordinates. No screen mapping — consumers decide."""
+    """Normalized gaze coordinates. No screen mapping — consumers decide.
+
+    Immutable: the engine publishes a new instance per frame by rebinding a
+    single attribute, so readers can share it without locking.
+    """
     gaze_x: float = 0.5       # [0,1] horizontal (0=left, 1=right)
     gaze_y: float = 0.5       # [0,1] vertical (0=up, 1=down)
     face_detected: bool = False
@@ -135,11 +149,67 @@ class GazeResult:
     timestamp: float = 0.0
 
 
+# ============================================================
+# Latest-Frame Handoff
+# ============================================================
+
+class _LatestFrame:
+    """Hands the newest camera frame from the capture thread to inference.
+
+    Three preallocated buffers: the capture thread always writes into a slot
+    that is neither the latest published frame nor the one inference is
+    reading, so neither side blocks on the other and frames never tear.
+    Each slot also keeps its frame's capture time (monotonic ns).
+    """
+
+    def __init__(self, height: int, width: int) -> None:
+        self._bufs = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(3)]
+        self._times = [0, 0, 0]
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._writing = 0
+        self._latest = -1
+        self._reading = -1
+
+    def write_buffer(self) -> np.ndarray:
+        """Buffer for the capture thread to read the next frame into."""
+        return self._bufs[self._writing]
+
+    def publish(self, frame: np.ndarray) -> None:
+        """Publish the frame just captured into write_buffer()."""
+        captured_ns = time.monotonic_ns()
+        with self._lock:
+            # read() may hand back a new array if the frame size changed
+            self._bufs[self._writing] = frame
+            self._times[self._writing] = captured_ns
+            self._latest = self._writing
+            self._writing = next(
+                i for i in range(3) if i != self._latest and i != self._reading
+            )
+            self._ready.set()
+
+    def take(self, timeout: float) -> tuple[np.ndarray, int] | None:
+        """Wait for a frame newer than the last one taken.
+
+        Returns (frame, capture time in monotonic ns); None on timeout.
+        """
+        if not self._ready.wait(timeout):
+            return None
+        with self._lock:
+            self._ready.clear()
+            self._reading = self._latest
+            return self._bufs[self._reading], self._times[self._reading]
+
+
 # ============================================================
 # Gaze Engine
 # ============================================================
 
 def _safe_ratio(numerator: float, denominator: float, fallback: float = 0.5) -> float:
+    """numerator / denominator, or fallback for a ~0 denominator or non-finite result.
+
+    Scalar branches cost ~0.1 µs here; np.where over all four ratios costs ~5 µs.
+    """
     if abs(denominator) < ZERO_DIVISION_EPSILON:
         return fallback
     r = numerator / denominator
@@ -149,7 +219,14 @@ def _safe_ratio(numerator: float, denominator: float, fallback: float = 0.5) ->
 def _extract_gaze_ratios(
     landmarks: list,
 ) -> tuple[float, float] | None:
-    """Extract normalized gaze ratios from MediaPipe face landmarks."""
+    """Extract normalized gaze ratios from MediaPipe face landmarks.
+
+    Deliberately scalar: Tasks API landmarks are plain Python objects and only
+    ten are read, so this runs in under a microsecond. Gathering them into a
+    NumPy array first costs ~20 µs of array setup per frame. A compiled
+    (Cython) version would not help either: the landmarks are Python
+    dataclasses, not protobufs, so C code still pays the same getattr calls.
+    """
     if len(landmarks) < MIN_LANDMARKS_FOR_IRIS:
         return None
 
@@ -182,7 +259,13 @@ MODEL_DOWNLOAD_RETRIES = 3
 
 
 class GazeEngine:
-    """Background gaze tracking engine. Thread-safe read access to latest result."""
+    """Background gaze tracking engine. Thread-safe read access to latest result.
+
+    _lock guards the _running/_error state transitions only. The per-frame
+    outputs (_result, _fps, _camera_resolution) are immutable values
+    published by attribute rebinding, which is atomic under the GIL, so
+    readers never contend with the tracking thread.
+    """
 
     def __init__(self) -> None:
         self._lock = threading.Lock()
@@ -235,51 +318,137 @@ class GazeEngine:
             return self._error
 
     def get_gaze(self) -> GazeResult:
-        with self._lock:
-            return GazeResult(
-                gaze_x=self._result.gaze_x,
-                gaze_y=self._result.gaze_y,
-                face_detected=self._result.face_detected,
-                confidence=self._result.confidence,
-                timestamp=self._result.timestamp,
-            )
+        return self._result
 
     def get_status(self) -> dict:
         with self._lock:
-            return {
-                "running": self._running,
-                "fps": round(self._fps, 1),
-                "camera_resolution": list(self._camera_resolution),
-                "face_detected": self._result.face_detected,
-                "error": self._error,
-            }
+            running = self._running
+            error = self._error
+        return {
+            "running": running,
+            "fps": round(self._fps, 1),
+            "camera_resolution": list(self._camera_resolution),
+            "face_detected": self._result.face_detected,
+            "error": error,
+        }
+
+    @staticmethod
+    def _capture_loop(cap, frames: _LatestFrame, stop: threading.Event) -> None:
+        """Capture thread: read frames at camera rate into the handoff slots."""
+        interval = 1.0 / CAMERA_FPS
+        while not stop.is_set():
+            ret, frame = cap.read(frames.write_buffer())
+            if not ret:
+                time.sleep(interval)
+                continue
+            frames.publish(frame)
 
     def _run(self) -> None:
-        """Background thread: camera capture → MediaPipe → One Euro Filter."""
+        """Background thread: frame handoff → MediaPipe (async) → One Euro Filter."""
         cap = None
         landmarker = None
+        capture_thread = None
+        capture_stop = threading.Event()
 
         try:
-            # Initialize MediaPipe FaceLandmarker
-            model_data = self._download_model()
-            base_options = mp.tasks.BaseOptions(
-                model_asset_path=None,
-                model_asset_buffer=model_data,
-            )
-            options = mp.tasks.vision.FaceLandmarkerOptions(
-                base_options=base_options,
-                running_mode=mp.tasks.vision.RunningMode.IMAGE,
-                num_faces=1,
-                min_face_detection_confidence=FACE_CONFIDENCE_THRESHOLD,
-                min_face_presence_confidence=FACE_CONFIDENCE_THRESHOLD,
-                min_tracking_confidence=FACE_CONFIDENCE_THRESHOLD,
-                output_face_blendshapes=False,
-                output_facial_transformation_matrixes=False,
-            )
-            landmarker = mp.tasks.vision.FaceLandmarker.create_from_options(options)
+            # One Euro Filter over both axes
+            filter_xy = OneEuroFilter2D(freq=CAMERA_FPS)
+
+            frame_count = 0
+            fps_start = time.monotonic_ns()
+            last_face = fps_start
+
+            def on_result(result, output_image, timestamp_ms: int) -> None:
+                """LIVE_STREAM callback; MediaPipe delivers results one at a time."""
+                nonlocal frame_count, fps_start, last_face
+                now = time.time()
+
+                if result.face_landmarks and len(result.face_landmarks) > 0:
+                    last_face = time.monotonic_ns()
+                    ratios = _extract_gaze_ratios(result.face_landmarks[0])
+                    if ratios is not None:
+                        raw_x, raw_y = ratios
+                        # Filter on the frame's capture time so inference
+                        # latency jitter does not leak into the derivative
+                        smooth_x, smooth_y = filter_xy.filter(
+                            raw_x, raw_y, timestamp_ms / 1000.0
+                        )
+
+                        # bug-121: clamp to [0, 1] range (inline; skips two
+                        # builtin calls per axis on the common in-range path)
+                        clamped_x = (
+                            smooth_x if 0.0 <= smooth_x <= 1.0
+                            else (0.0 if smooth_x < 0.0 else 1.0)
+                        )
+                        clamped_y = (
+                            smooth_y if 0.0 <= smooth_y <= 1.0
+                            else (0.0 if smooth_y < 0.0 else 1.0)
+                        )
+
+                        self._result = GazeResult(
+                            gaze_x=clamped_x,
+                            gaze_y=clamped_y,
+                            face_detected=True,
+                            confidence=0.85,
+                            timestamp=now,
+                        )
+                else:
+                    last = self._result
+                    self._result = GazeResult(
+                        gaze_x=last.gaze_x,
+                        gaze_y=last.gaze_y,
+                        face_detected=False,
+                        confidence=0.0,
+                        timestamp=now,
+                    )
+
+                # FPS calculation (results delivered, not frames submitted)
+                frame_count += 1
+                now_ns = time.monotonic_ns()
+                elapsed_fps = now_ns - fps_start
+                if elapsed_fps >= 1_000_000_000:
+                    self._fps = frame_count * 1e9 / elapsed_fps
+                    frame_count = 0
+                    fps_start = now_ns
+
+            # Initialize MediaPipe FaceLandmarker. LIVE_STREAM pipelines
+            # inference on MediaPipe's own threads and drops frames while it
+            # is busy, so capture and inference overlap instead of serializing.
+            model_path, model_data = self._load_model()
+            delegate = mp.tasks.BaseOptions.Delegate
+            delegates = [delegate.GPU, delegate.CPU] if USE_GPU else [delegate.CPU]
+            for i, d in enumerate(delegates, 1):
+                base_options = mp.tasks.BaseOptions(
+                    model_asset_path=model_path,
+                    model_asset_buffer=model_data,
+                    delegate=d,
+                )
+                options = mp.tasks.vision.FaceLandmarkerOptions(
+                    base_options=base_options,
+                    running_mode=mp.tasks.vision.RunningMode.LIVE_STREAM,
+                    result_callback=on_result,
+                    num_faces=1,
+                    min_face_detection_confidence=FACE_CONFIDENCE_THRESHOLD,
+                    min_face_presence_confidence=FACE_CONFIDENCE_THRESHOLD,
+                    min_tracking_confidence=FACE_CONFIDENCE_THRESHOLD,
+                    output_face_blendshapes=False,
+                    output_facial_transformation_matrixes=False,
+                )
+                try:
+                    landmarker = mp.tasks.vision.FaceLandmarker.create_from_options(options)
+                    break
+                except Exception as e:
+                    if i == len(delegates):
+                        raise
+                    print(f"GPU delegate unavailable, using CPU: {e}", file=sys.stderr)
+            # The landmarker holds its own copy; don't keep a second one alive
+            model_data = None
 
             # Open camera
             cap = cv2.VideoCapture(0)
+            # Queue at most one frame in the driver so read() returns the newest
+            # frame instead of a backlog that grows whenever inference stalls
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
             cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
             cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
             cap.set(cv2.CAP_PROP_FPS, CAMERA_FPS)
@@ -289,85 +458,120 @@ class GazeEngine:
 
             actual_w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
             actual_h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            buffer_size = int(cap.get(cv2.CAP_PROP_BUFFERSIZE))
+            if buffer_size != 1:
+                print(
+                    f"Camera backend ignored CAP_PROP_BUFFERSIZE=1 (reports {buffer_size})",
+                    file=sys.stderr,
+                )
+
+            # Capture runs on its own thread so the driver is drained at camera
+            # rate and inference always picks up the newest frame
+            frames = _LatestFrame(actual_h, actual_w)
+            capture_thread = threading.Thread(
+                target=self._capture_loop,
+                args=(cap, frames, capture_stop),
+                daemon=True,
+            )
+            capture_thread.start()
 
+            self._camera_resolution = (actual_w, actual_h)
             with self._lock:
                 self._running = True
-                self._camera_resolution = (actual_w, actual_h)
-
-            # One Euro Filters (one per axis)
-            filter_x = OneEuroFilter(freq=CAMERA_FPS)
-            filter_y = OneEuroFilter(freq=CAMERA_FPS)
 
-            frame_count = 0
-            fps_start = time.monotonic()
+            infer_w, infer_h = actual_w, actual_h
+            small = None
+            if 0 < INFER_WIDTH < actual_w:
+                infer_w = INFER_WIDTH
+                infer_h = max(1, round(actual_h * INFER_WIDTH / actual_w))
+                small = np.empty((infer_h, infer_w, 3), dtype=np.uint8)
+
+            # Reused BGR → RGB conversion target; cvtColor hands back a new
+            # array instead if the frame size ever changes. It stays
+            # C-contiguous, so mp.Image takes it without a conversion pass.
+            rgb = np.empty((infer_h, infer_w, 3), dtype=np.uint8)
+            # mp.Image copies the pixels into its own ImageFrame and has no
+            # way to swap its buffer, so a fresh wrapper per frame is needed;
+            # only the enum lookup is hoisted out of the loop.
+            srgb = mp.ImageFormat.SRGB
+
+            # Pacing runs on integer monotonic_ns: no float rounding drift
+            # however long the tracker stays up
             interval = 1.0 / CAMERA_FPS
+            interval_ns = 1_000_000_000 // CAMERA_FPS
+            deadline = time.monotonic_ns()
+            last_ts_ms = -1
+            prev_thumb = None
+            idle_skipped = 0
 
             while not self._stop_event.is_set():
-                t0 = time.monotonic()
-                ret, frame = cap.read()
-                if not ret:
-                    time.sleep(interval)
+                taken = frames.take(timeout=interval)
+                if taken is None:
                     continue
-
-                # Convert BGR → RGB for MediaPipe
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb)
-                result = landmarker.detect(mp_image)
-
-                now = time.time()
-
-                if result.face_landmarks and len(result.face_landmarks) > 0:
-                    ratios = _extract_gaze_ratios(result.face_landmarks[0])
-                    if ratios is not None:
-                        raw_x, raw_y = ratios
-                        smooth_x = filter_x.filter(raw_x, now)
-                        smooth_y = filter_y.filter(raw_y, now)
-
-                        # bug-121: clamp to [0, 1] range
-                        clamped_x = max(0.0, min(1.0, smooth_x))
-                        clamped_y = max(0.0, min(1.0, smooth_y))
-
-                        with self._lock:
-                            self._result = GazeResult(
-                                gaze_x=clamped_x,
-                                gaze_y=clamped_y,
-                                face_detected=True,
-                                confidence=0.85,
-                                timestamp=now,
-                            )
+                frame, captured_ns = taken
+
+                if captured_ns - last_face > ABSENT_AFTER_NS:
+                    # Nobody in view: a thumbnail diff is far cheaper than
+                    # FaceLandmarker, so only motion or every Nth frame runs it
+                    thumb = cv2.cvtColor(
+                        cv2.resize(frame, MOTION_THUMB_SIZE, interpolation=cv2.INTER_AREA),
+                        cv2.COLOR_BGR2GRAY,
+                    )
+                    moved = (
+                        prev_thumb is None
+                        or cv2.absdiff(thumb, prev_thumb).mean() > MOTION_THRESHOLD
+                    )
+                    prev_thumb = thumb
+                    idle_skipped += 1
+                    if not moved and idle_skipped < ABSENT_INFER_EVERY:
+                        continue
+                    idle_skipped = 0
                 else:
-                    with self._lock:
-                        self._result = GazeResult(
-                            gaze_x=self._result.gaze_x,
-                            gaze_y=self._result.gaze_y,
-                            face_detected=False,
-                            confidence=0.0,
-                            timestamp=now,
-                        )
-
-                # FPS calculation
-                frame_count += 1
-                elapsed_fps = time.monotonic() - fps_start
-                if elapsed_fps >= 1.0:
-                    with self._lock:
-                        self._fps = frame_count / elapsed_fps
-                    frame_count = 0
-                    fps_start = time.monotonic()
-
-                # Maintain target frame rate
-                elapsed = time.monotonic() - t0
-                sleep_time = interval - elapsed
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
+                    prev_thumb = None
+
+                if small is not None:
+                    # Landmarks are normalized, so downscaling leaves the gaze
+                    # ratios' scale unchanged
+                    small = cv2.resize(
+                        frame, (infer_w, infer_h), dst=small,
+                        interpolation=cv2.INTER_AREA,
+                    )
+                    frame = small
+
+                # Convert BGR → RGB for MediaPipe. mp.Image copies the pixels,
+                # so the buffer is free for the next frame once it is built.
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+                mp_image = mp.Image(image_format=srgb, data=rgb)
+                # Stamp with the capture time, so the filter in on_result sees
+                # real frame spacing. LIVE_STREAM rejects timestamps that do
+                # not strictly increase.
+                ts_ms = captured_ns // 1_000_000
+                if ts_ms <= last_ts_ms:
+                    ts_ms = last_ts_ms + 1
+                last_ts_ms = ts_ms
+                landmarker.detect_async(mp_image, ts_ms)
+
+                now_ns = time.monotonic_ns()
+
+                # Maintain target frame rate against absolute deadlines so
+                # per-frame sleep rounding does not accumulate into drift;
+                # after a stall, resync rather than bursting to catch up
+                deadline += interval_ns
+                if deadline < now_ns:
+                    deadline = now_ns
+                else:
+                    time.sleep((deadline - now_ns) / 1e9)
 
         except Exception as e:
             # bug-119: propagate error to caller via shared state
-            import sys
             err_msg = f"GazeEngine error: {e}"
             print(err_msg, file=sys.stderr)
             with self._lock:
                 self._error = err_msg
         finally:
+            capture_stop.set()
+            if capture_thread is not None:
+                capture_thread.join(timeout=2.0)
             if cap is not None:
                 cap.release()
             if landmarker is not None:
@@ -375,11 +579,61 @@ class GazeEngine:
             with self._lock:
                 self._running = False
 
+    @staticmethod
+    def _model_cache_path() -> str:
+        """On-disk cache location for FACE_MODEL_URL."""
+        key = hashlib.sha256(FACE_MODEL_URL.encode()).hexdigest()[:16]
+        return os.path.join(MODEL_CACHE_DIR, f"face_landmarker-{key}.task")
+
+    @staticmethod
+    def _file_sha256(path: str) -> str:
+        """Hex sha256 of a file, streamed so it is never held in memory whole."""
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    @classmethod
+    def _load_model(cls) -> tuple[str | None, bytes | None]:
+        """Locate the model as (asset_path, asset_buffer); exactly one is set.
+
+        Normally returns the disk cache path so MediaPipe maps the file itself
+        rather than parsing a Python-heap copy. A cached file whose sha256
+        does not match its sidecar is treated as corrupt and fetched again;
+        if the cache cannot be written, the downloaded bytes are returned.
+        """
+        path = cls._model_cache_path()
+        try:
+            with open(path + ".sha256", encoding="utf-8") as f:
+                expected = f.read().strip()
+            if cls._file_sha256(path) == expected:
+                return path, None
+            print("Cached model failed checksum; downloading again", file=sys.stderr)
+        except OSError:
+            pass
+
+        data = cls._download_model()
+        try:
+            os.makedirs(MODEL_CACHE_DIR, exist_ok=True)
+            # Write to temp files and rename so a crash never leaves a
+            # truncated model under the final name
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(hashlib.sha256(data).hexdigest())
+            os.replace(tmp, path + ".sha256")
+        except OSError as e:
+            print(f"Could not cache model at {path}: {e}", file=sys.stderr)
+            return None, data
+        return path, None
+
     @staticmethod
     def _download_model() -> bytes:
         """Download MediaPipe FaceLandmarker model with retry and timeout."""
         import urllib.request
-        import sys
 
         for attempt in range(1, MODEL_DOWNLOAD_RETRIES + 1):
             try:
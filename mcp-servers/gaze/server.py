@@ -30,76 +30,98 @@ engine = GazeEngine()
 # ============================================================
 
 
-@server.list_tools()
-async def list_tools() -> list[Tool]:
-    return [
-        Tool(
-            name="start_tracking",
-            description=(
-                "Start webcam camera capture and eye gaze tracking. "
-                "Uses MediaPipe FaceLandmarker for iris detection. "
-                "Runs continuously in background until stopped."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": [],
-            },
-        ),
-        Tool(
-            name="stop_tracking",
-            description="Stop gaze tracking and release the camera.",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": [],
-            },
+# Tool definitions are static; build them once at import.
+_TOOLS = [
+    Tool(
+        name="start_tracking",
+        description=(
+            "Start webcam camera capture and eye gaze tracking. "
+            "Uses MediaPipe FaceLandmarker for iris detection. "
+            "Runs continuously in background until stopped."
         ),
-        Tool(
-            name="get_gaze",
-            description=(
-                "Get the current gaze direction as normalized coordinates. "
-                "Returns gaze_x [0-1] (0=left, 1=right) and gaze_y [0-1] "
-                "(0=up, 1=down). Tracking must be started first."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": [],
-            },
+        inputSchema={
+            "type": "object",
+            "properties": {},
+            "required": [],
+        },
+    ),
+    Tool(
+        name="stop_tracking",
+        description="Stop gaze tracking and release the camera.",
+        inputSchema={
+            "type": "object",
+            "properties": {},
+            "required": [],
+        },
+    ),
+    Tool(
+        name="get_gaze",
+        description=(
+            "Get the current gaze direction as normalized coordinates. "
+            "Returns gaze_x [0-1] (0=left, 1=right) and gaze_y [0-1] "
+            "(0=up, 1=down). Tracking must be started first."
         ),
-        Tool(
-            name="is_user_present",
-            description=(
-                "Check if a user face is currently detected by the camera. "
-                "Useful for attention monitoring and presence detection."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": [],
-            },
+        inputSchema={
+            "type": "object",
+            "properties": {},
+            "required": [],
+        },
+    ),
+    Tool(
+        name="is_user_present",
+        description=(
+            "Check if a user face is currently detected by the camera. "
+            "Useful for attention monitoring and presence detection."
         ),
-        Tool(
-            name="get_tracker_status",
-            description=(
-                "Get the operational status of the gaze tracker: "
-                "whether it is running, current FPS, camera resolution, "
-                "and face detection state."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": [],
-            },
+        inputSchema={
+            "type": "object",
+            "properties": {},
+            "required": [],
+        },
+    ),
+    Tool(
+        name="get_tracker_status",
+        description=(
+            "Get the operational status of the gaze tracker: "
+            "whether it is running, current FPS, camera resolution, "
+            "and face detection state."
         ),
-    ]
+        inputSchema={
+            "type": "object",
+            "properties": {},
+            "required": [],
+        },
+    ),
+]
+
+
+@server.list_tools()
+async def list_tools() -> list[Tool]:
+    return _TOOLS
 
 
 # ============================================================
 # Tool handlers
 # ============================================================
 
+# Responses that never vary are encoded once at import
+_START_RESPONSES = {
+    status: json.dumps({"status": status, "message": message})
+    for status, message in {
+        "started": "Gaze tracking started. Camera is now active.",
+        "already_running": "Gaze tracking is already running.",
+    }.items()
+}
+_STOP_RESPONSES = {
+    status: json.dumps({"status": status, "message": message})
+    for status, message in {
+        "stopped": "Gaze tracking stopped. Camera released.",
+        "not_running": "Gaze tracking was not running.",
+    }.items()
+}
+_NOT_RUNNING = "Tracker not running. Call start_tracking first."
+_NOT_RUNNING_RESPONSE = json.dumps({"error": _NOT_RUNNING})
+
 
 @server.call_tool()
 async def call_tool(name: str, arguments: dict) -> list[TextContent]:
@@ -107,53 +129,44 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         result = await asyncio.get_event_loop().run_in_executor(
             None, engine.start
         )
-        return [TextContent(type="text", text=json.dumps({
-            "status": result,
-            "message": {
-                "started": "Gaze tracking started. Camera is now active.",
-                "already_running": "Gaze tracking is already running.",
-            }.get(result, result),
-        }))]
+        text = _START_RESPONSES.get(result) or json.dumps(
+            {"status": result, "message": result}
+        )
+        return [TextContent(type="text", text=text)]
 
     elif name == "stop_tracking":
         result = await asyncio.get_event_loop().run_in_executor(
             None, engine.stop
         )
-        return [TextContent(type="text", text=json.dumps({
-            "status": result,
-            "message": {
-                "stopped": "Gaze tracking stopped. Camera released.",
-                "not_running": "Gaze tracking was not running.",
-            }.get(result, result),
-        }))]
+        text = _STOP_RESPONSES.get(result) or json.dumps(
+            {"status": result, "message": result}
+        )
+        return [TextContent(type="text", text=text)]
 
     elif name == "get_gaze":
         if not engine.is_running:
             err = engine.error
-            return [TextContent(type="text", text=json.dumps({
-                "error": err or "Tracker not running. Call start_tracking first.",
-            }))]
+            text = json.dumps({"error": err}) if err else _NOT_RUNNING_RESPONSE
+            return [TextContent(type="text", text=text)]
 
+        # Polled at the agent's tick rate: a single format call instead of a
+        # dict plus json.dumps. Every field is a finite float or a bool.
         gaze = engine.get_gaze()
-        return [TextContent(type="text", text=json.dumps({
-            "gaze_x": round(gaze.gaze_x, 4),
-            "gaze_y": round(gaze.gaze_y, 4),
-            "face_detected": gaze.face_detected,
-            "confidence": round(gaze.confidence, 2),
-            "timestamp": round(gaze.timestamp, 3),
-        }))]
+        return [TextContent(type="text", text=(
+            f'{{"gaze_x": {gaze.gaze_x:.4f}, "gaze_y": {gaze.gaze_y:.4f}, '
+            f'"face_detected": {"true" if gaze.face_detected else "false"}, '
+            f'"confidence": {gaze.confidence:.2f}, "timestamp": {gaze.timestamp:.3f}}}'
+        ))]
 
     elif name == "is_user_present":
         if not engine.is_running:
-            return [TextContent(type="text", text=json.dumps({
-                "error": "Tracker not running. Call start_tracking first.",
-            }))]
+            return [TextContent(type="text", text=_NOT_RUNNING_RESPONSE)]
 
         gaze = engine.get_gaze()
-        return [TextContent(type="text", text=json.dumps({
-            "present": gaze.face_detected,
-            "confidence": round(gaze.confidence, 2),
-        }))]
+        return [TextContent(type="text", text=(
+            f'{{"present": {"true" if gaze.face_detected else "false"}, '
+            f'"confidence": {gaze.confidence:.2f}}}'
+        ))]
 
     elif name == "get_tracker_status":
         status = engine.get_status()
@@ -8,19 +8,38 @@ Phase 2: Vector embedding integration (cosine similarity search)
 """
 
 import asyncio
+import contextlib
 import json
 import logging
 import os
 import re
 import struct
 import hashlib
+import time
+from collections import Counter, OrderedDict
 from datetime import datetime, timezone
+from pathlib import Path
 
 import aiosqlite
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import TextContent, Tool
 
+try:
+    import orjson
+except ImportError:  # optional speedup: pip install cloto-mcp-ks22[json]
+    orjson = None
+
+try:
+    import simsimd
+except ImportError:  # optional speedup: pip install cloto-mcp-ks22[simd]
+    simsimd = None
+
+try:
+    import sqlite_vec
+except ImportError:  # optional vector index: pip install cloto-mcp-ks22[vec]
+    sqlite_vec = None
+
 logger = logging.getLogger(__name__)
 
 # ============================================================
@@ -31,6 +50,10 @@ DB_PATH = os.environ.get("KS22_DB_PATH", "data/ks22_memory.db")
 MAX_MEMORIES = int(os.environ.get("KS22_MAX_MEMORIES", "500"))
 FTS_ENABLED = os.environ.get("KS22_FTS_ENABLED", "true").lower() == "true"
 
+# Read-only connections for recall/list queries (0 = share the writer).
+# WAL lets them read concurrently with each other and with the writer.
+READ_POOL_SIZE = int(os.environ.get("KS22_READ_POOL_SIZE", "4"))
+
 # Embedding configuration
 EMBEDDING_MODE = os.environ.get("KS22_EMBEDDING_MODE", "none")
 EMBEDDING_URL = os.environ.get("KS22_EMBEDDING_URL", "")
@@ -40,9 +63,32 @@ EMBEDDING_API_URL = os.environ.get(
 )
 EMBEDDING_MODEL = os.environ.get("KS22_EMBEDDING_MODEL", "text-embedding-3-small")
 
-# Vector search threshold (cosine similarity, 0.0-1.0)
+# Vector search threshold (cosine similarity, -1.0-1.0; stored vectors are
+# unit length, so similarity is a plain dot product)
 VECTOR_MIN_SIMILARITY = float(os.environ.get("KS22_VECTOR_MIN_SIMILARITY", "0.3"))
 
+# Store new embeddings as int8 codes plus a float32 scale (~4x smaller).
+# Existing float32 rows stay searchable; int8 rows carry a magic prefix.
+EMBEDDING_INT8 = os.environ.get("KS22_EMBEDDING_INT8", "false").lower() == "true"
+
+# Rank candidates by Hamming distance of 1-bit sign codes first, then rescore
+# only the best limit * BINARY_PREFILTER_FACTOR with the full embeddings.
+BINARY_PREFILTER = os.environ.get("KS22_BINARY_PREFILTER", "false").lower() == "true"
+BINARY_PREFILTER_FACTOR = 10
+
+# Answer vector recall from a sqlite-vec KNN index instead of scanning the
+# newest MAX_MEMORIES rows. Needs sqlite_vec and SQLite extension loading.
+VEC_INDEX = os.environ.get("KS22_VEC_INDEX", "false").lower() == "true"
+
+# Recent query embeddings kept per process (identical recalls skip the model)
+QUERY_CACHE_SIZE = 256
+
+# Group concurrent stores: up to EMBED_BATCH_MAX rows share one embedding
+# request and one executemany, waiting at most EMBED_BATCH_WINDOW_SECS for more.
+EMBED_BATCH = os.environ.get("KS22_EMBED_BATCH", "false").lower() == "true"
+EMBED_BATCH_MAX = 32
+EMBED_BATCH_WINDOW_SECS = 0.02
+
 # ============================================================
 # Embedding Client
 # ============================================================
@@ -65,6 +111,7 @@ class EmbeddingClient:
         self._api_url = api_url
         self._model = model
         self._client = None
+        self._query_cache: OrderedDict[tuple[str, str], list[float]] = OrderedDict()
 
     async def initialize(self):
         """Create persistent HTTP client."""
@@ -82,22 +129,50 @@ class EmbeddingClient:
             self._client = None
 
     async def embed(self, texts: list[str]) -> list[list[float]] | None:
-        """Compute embeddings. Returns None on failure (graceful degradation)."""
+        """Compute L2-normalized embeddings. Returns None on failure (graceful degradation).
+
+        Normalizing here, before anything is stored or searched, makes cosine
+        similarity a plain dot product at recall time.
+        """
         if self.mode == "none" or not self._client:
             return None
 
         try:
             if self.mode == "http":
-                return await self._embed_via_http(texts)
+                embeddings = await self._embed_via_http(texts)
             elif self.mode == "api":
-                return await self._embed_via_api(texts)
+                embeddings = await self._embed_via_api(texts)
             else:
                 logger.warning("Unknown embedding mode: %s", self.mode)
                 return None
+            if not embeddings:
+                return embeddings
+            return self.normalize(embeddings)
         except Exception as e:
             logger.warning("Embedding request failed: %s", e)
             return None
 
+    async def embed_query(self, query: str) -> list[float] | None:
+        """Embed a single recall query, reusing the result for repeated queries.
+
+        Embeddings are deterministic for a fixed model, so the cache is keyed
+        by (model, query). Failures are not cached.
+        """
+        model = self._http_url if self.mode == "http" else self._model
+        key = (model, query)
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            self._query_cache.move_to_end(key)
+            return cached
+
+        embeddings = await self.embed([query])
+        if not embeddings or not embeddings[0]:
+            return None
+        self._query_cache[key] = embeddings[0]
+        if len(self._query_cache) > QUERY_CACHE_SIZE:
+            self._query_cache.popitem(last=False)
+        return embeddings[0]
+
     async def _embed_via_http(self, texts: list[str]) -> list[list[float]] | None:
         """Call the embedding server's HTTP endpoint."""
         response = await self._client.post(
@@ -110,8 +185,6 @@ class EmbeddingClient:
 
     async def _embed_via_api(self, texts: list[str]) -> list[list[float]] | None:
         """Call OpenAI-compatible embedding API directly."""
-        import numpy as np
-
         response = await self._client.post(
             self._api_url,
             headers={
@@ -122,38 +195,97 @@ class EmbeddingClient:
         )
         response.raise_for_status()
         data = response.json()
-        embeddings = [item["embedding"] for item in data["data"]]
+        return [item["embedding"] for item in data["data"]]
+
+    @staticmethod
+    def normalize(embeddings: list[list[float]]) -> list[list[float]]:
+        """L2-normalize each embedding (float32 precision)."""
+        import numpy as np
 
-        # L2-normalize for consistent cosine similarity via dot product
-        result = []
-        for emb in embeddings:
-            vec = np.array(emb, dtype=np.float32)
-            norm = np.linalg.norm(vec)
-            if norm > 1e-9:
-                vec = vec / norm
-            result.append(vec.tolist())
+        arr = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(arr, axis=1, keepdims=True)
+        np.clip(norms, 1e-9, None, out=norms)
+        arr /= norms
+        return arr.tolist()
 
-        return result
+    # Leads every int8 BLOB. As float32 it reads as a NaN, which no stored
+    # (normalized) embedding starts with, so the layout never has to be
+    # guessed from the length: 4 + 4 + dim int8 bytes can equal 4 * dim'
+    # float32 bytes of another dimension.
+    INT8_MAGIC = b"Q8\xc0\x7f"
 
     @staticmethod
     def pack_embedding(embedding: list[float]) -> bytes:
-        """Pack a float list into a BLOB (little-endian float32)."""
+        """Pack a float list into a BLOB.
+
+        Little-endian float32 by default; with KS22_EMBEDDING_INT8 INT8_MAGIC,
+        a float32 scale, then one int8 code per dimension (value = code * scale).
+        """
+        if EMBEDDING_INT8:
+            import numpy as np
+
+            scale, codes = EmbeddingClient.quantize_int8(
+                np.asarray(embedding, dtype=np.float32)
+            )
+            return EmbeddingClient.INT8_MAGIC + struct.pack("<f", scale) + codes.tobytes()
         return struct.pack(f"<{len(embedding)}f", *embedding)
 
     @staticmethod
     def unpack_embedding(blob: bytes) -> list[float]:
-        """Unpack a BLOB into a float list."""
+        """Unpack a BLOB (either layout) into a float list."""
+        if blob[:4] == EmbeddingClient.INT8_MAGIC:
+            (scale,) = struct.unpack_from("<f", blob, 4)
+            return [c * scale for c in struct.unpack_from(f"<{len(blob) - 8}b", blob, 8)]
         n = len(blob) // 4
         return list(struct.unpack(f"<{n}f", blob))
 
+    @staticmethod
+    def pack_sign_bits(embedding: list[float]) -> bytes:
+        """Pack the embedding's sign pattern (1 bit per dimension) for prefiltering."""
+        import numpy as np
+
+        return np.packbits(np.asarray(embedding, dtype=np.float32) > 0).tobytes()
+
+    @staticmethod
+    def quantize_int8(vec) -> tuple:
+        """Symmetric per-vector int8 quantization: (scale, codes)."""
+        import numpy as np
+
+        peak = float(np.abs(vec).max()) if len(vec) else 0.0
+        scale = peak / 127.0 if peak > 0.0 else 1.0
+        codes = np.clip(np.rint(vec / scale), -127, 127).astype(np.int8)
+        return scale, codes
+
 
 _embedding_client: EmbeddingClient | None = None
 
+# ============================================================
+# JSON Helpers
+# ============================================================
+
+
+def _json_dumps(obj) -> str:
+    """Serialize obj to a JSON string, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+def _json_loads(data: str | bytes):
+    """Parse a JSON document, using orjson when available.
+
+    Raises json.JSONDecodeError on invalid input (orjson's error subclasses it).
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 # ============================================================
 # Database
 # ============================================================
 
-SCHEMA_VERSION = 1
+SCHEMA_VERSION = 2
 
 SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS schema_version (
@@ -170,6 +302,7 @@ CREATE TABLE IF NOT EXISTS memories (
     timestamp  TEXT NOT NULL,
     metadata   TEXT NOT NULL DEFAULT '{}',
     embedding  BLOB,
+    embedding_bin BLOB,
     created_at TEXT NOT NULL DEFAULT (datetime('now'))
 );
 
@@ -179,6 +312,10 @@ CREATE INDEX IF NOT EXISTS idx_memories_agent
 CREATE INDEX IF NOT EXISTS idx_memories_msg_id
     ON memories(agent_id, msg_id);
 
+-- Vector recall scans only embedded rows, newest first
+CREATE INDEX IF NOT EXISTS idx_memories_agent_emb
+    ON memories(agent_id, created_at DESC) WHERE embedding IS NOT NULL;
+
 CREATE TABLE IF NOT EXISTS profiles (
     id         INTEGER PRIMARY KEY AUTOINCREMENT,
     agent_id   TEXT NOT NULL,
@@ -194,6 +331,7 @@ CREATE TABLE IF NOT EXISTS episodes (
     summary    TEXT NOT NULL,
     keywords   TEXT NOT NULL DEFAULT '',
     embedding  BLOB,
+    embedding_bin BLOB,
     start_time TEXT,
     end_time   TEXT,
     created_at TEXT NOT NULL DEFAULT (datetime('now'))
@@ -201,6 +339,9 @@ CREATE TABLE IF NOT EXISTS episodes (
 
 CREATE INDEX IF NOT EXISTS idx_episodes_agent
     ON episodes(agent_id, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_episodes_agent_emb
+    ON episodes(agent_id, created_at DESC) WHERE embedding IS NOT NULL;
 """
 
 FTS_SQL = """
@@ -230,52 +371,223 @@ CREATE TRIGGER IF NOT EXISTS episodes_au AFTER UPDATE ON episodes BEGIN
 END;
 """
 
+# Trigram index over memories.content, so keyword recall's substring match
+# can use an index instead of scanning with LIKE. Trigram needs SQLite 3.34+.
+MEMORIES_FTS_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5(
+    content,
+    content=memories,
+    content_rowid=id,
+    tokenize='trigram'
+);
+
+-- Sync triggers
+CREATE TRIGGER IF NOT EXISTS memories_ai AFTER INSERT ON memories BEGIN
+    INSERT INTO memories_fts(rowid, content) VALUES (new.id, new.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS memories_ad AFTER DELETE ON memories BEGIN
+    INSERT INTO memories_fts(memories_fts, rowid, content)
+    VALUES ('delete', old.id, old.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS memories_au AFTER UPDATE OF content ON memories BEGIN
+    INSERT INTO memories_fts(memories_fts, rowid, content)
+    VALUES ('delete', old.id, old.content);
+    INSERT INTO memories_fts(rowid, content) VALUES (new.id, new.content);
+END;
+"""
+
+# Prepared statements kept per connection (sqlite3 defaults to 128). Vector
+# recall builds one `id IN (?, ...)` variant per candidate count; the extra
+# room keeps those from evicting the fixed _SQL_* statements.
+_STATEMENT_CACHE_SIZE = 512
+
 _db: aiosqlite.Connection | None = None
+_db_lock = asyncio.Lock()
+_memories_fts = False
+
+# Set once memories has a unique (agent_id, msg_id) index, so the store
+# INSERT's ON CONFLICT clause enforces msg_id deduplication by itself
+_msg_id_unique = False
+
+# Idle read-only connections; None when reads go through the writer
+_readers: asyncio.Queue | None = None
+_reader_conns: list[aiosqlite.Connection] = []
+
+# Set once the sqlite-vec extension is loaded; names of vec0 tables known to exist
+_vec_enabled = False
+_vec_tables: set[str] = set()
+_vec_lock = asyncio.Lock()
+
+# Held for each write transaction on the shared writer, so one caller's
+# commit or rollback never includes another caller's uncommitted rows
+_write_lock = asyncio.Lock()
 
 
 async def get_db() -> aiosqlite.Connection:
     """Get or create the database connection."""
-    global _db
     if _db is not None:
         return _db
+    # Tool calls run concurrently; only the first one opens the connection
+    async with _db_lock:
+        if _db is None:
+            await _open_db()
+    return _db
+
+
+async def _open_db() -> None:
+    """Open the writer connection, apply the schema and publish it as _db."""
+    global _db, _vec_enabled, _memories_fts, _msg_id_unique
 
     # Ensure parent directory exists
     db_dir = os.path.dirname(DB_PATH)
     if db_dir:
         os.makedirs(db_dir, exist_ok=True)
 
-    _db = await aiosqlite.connect(DB_PATH)
-    await _db.execute("PRAGMA journal_mode=WAL")
-    await _db.execute("PRAGMA synchronous=NORMAL")
+    db = await aiosqlite.connect(DB_PATH, cached_statements=_STATEMENT_CACHE_SIZE)
+    await db.execute("PRAGMA journal_mode=WAL")
+    await db.execute("PRAGMA synchronous=NORMAL")
+    await _configure_connection(db)
 
     # Apply schema
-    await _db.executescript(SCHEMA_SQL)
+    await db.executescript(SCHEMA_SQL)
+    try:
+        await db.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_memories_msg_id_unique "
+            "ON memories(agent_id, msg_id) WHERE msg_id != ''"
+        )
+        _msg_id_unique = True
+    except aiosqlite.IntegrityError as e:
+        # Databases written before the index may already hold duplicates
+        logger.warning("duplicate msg_ids in memories, store checks with SELECT: %s", e)
 
     # Apply FTS if enabled
     if FTS_ENABLED:
-        await _db.executescript(FTS_SQL)
+        await db.executescript(FTS_SQL)
+        try:
+            existed = await db.execute_fetchall(
+                "SELECT 1 FROM sqlite_master WHERE name = 'memories_fts'"
+            )
+            await db.executescript(MEMORIES_FTS_SQL)
+            if not existed:
+                # Index memories stored before the table existed
+                await db.execute(
+                    "INSERT INTO memories_fts(memories_fts) VALUES ('rebuild')"
+                )
+                await db.commit()
+            _memories_fts = True
+        except aiosqlite.OperationalError as e:
+            logger.warning("memories_fts unavailable, keyword recall uses LIKE: %s", e)
+
+    if VEC_INDEX:
+        if sqlite_vec is None:
+            logger.warning("KS22_VEC_INDEX set but sqlite-vec is not installed")
+        else:
+            try:
+                await _load_vec_extension(db)
+                _vec_enabled = True
+            except (AttributeError, aiosqlite.OperationalError) as e:
+                # Some Python builds compile sqlite3 without extension loading
+                logger.warning("sqlite-vec unavailable, scanning vectors: %s", e)
 
     # Track schema version
-    row = await _db.execute_fetchall(
+    row = await db.execute_fetchall(
         "SELECT version FROM schema_version ORDER BY version DESC LIMIT 1"
     )
     current = row[0][0] if row else 0
     if current < SCHEMA_VERSION:
-        await _db.execute(
+        # v2: sign codes for the binary prefilter (existing tables predate them)
+        for table in ("memories", "episodes"):
+            columns = await db.execute_fetchall(f"PRAGMA table_info({table})")
+            if not any(col[1] == "embedding_bin" for col in columns):
+                await db.execute(f"ALTER TABLE {table} ADD COLUMN embedding_bin BLOB")
+        await db.execute(
             "INSERT OR REPLACE INTO schema_version (version) VALUES (?)",
             (SCHEMA_VERSION,),
         )
-        await _db.commit()
+        await db.commit()
 
-    return _db
+    if READ_POOL_SIZE > 0 and DB_PATH != ":memory:":
+        await _open_readers()
+
+    _db = db
+
+
+async def _configure_connection(db: aiosqlite.Connection) -> None:
+    """Per-connection cache settings: 256 MB memory-mapped I/O, 64 MB page cache,
+    temporary tables and sort spills kept in memory."""
+    await db.execute("PRAGMA temp_store=MEMORY")
+    await db.execute("PRAGMA mmap_size=268435456")
+    await db.execute("PRAGMA cache_size=-64000")
+
+
+async def _load_vec_extension(db: aiosqlite.Connection) -> None:
+    """Load sqlite-vec into db (raises if this sqlite3 build cannot load extensions)."""
+    await db.enable_load_extension(True)
+    await db.load_extension(sqlite_vec.loadable_path())
+    await db.enable_load_extension(False)
+
+
+async def _open_readers() -> None:
+    """Open READ_POOL_SIZE read-only connections to DB_PATH."""
+    global _readers
+    uri = Path(DB_PATH).resolve().as_uri() + "?mode=ro"
+    readers: asyncio.Queue = asyncio.Queue()
+    for _ in range(READ_POOL_SIZE):
+        conn = await aiosqlite.connect(
+            uri, uri=True, cached_statements=_STATEMENT_CACHE_SIZE
+        )
+        _reader_conns.append(conn)
+        await _configure_connection(conn)
+        if _vec_enabled:
+            await _load_vec_extension(conn)
+        readers.put_nowait(conn)
+    _readers = readers
+
+
+@contextlib.asynccontextmanager
+async def read_db():
+    """Borrow a read-only connection from the pool (the writer if there is none)."""
+    db = await get_db()
+    if _readers is None:
+        yield db
+        return
+    conn = await _readers.get()
+    try:
+        yield conn
+    finally:
+        _readers.put_nowait(conn)
+
+
+@contextlib.asynccontextmanager
+async def write_transaction(db: aiosqlite.Connection):
+    """Hold the writer for one transaction: commit on success, roll back on error.
+
+    Ensure vec indexes (_ensure_vec_table) before entering, not inside.
+    """
+    async with _write_lock:
+        try:
+            yield
+        except BaseException:
+            await db.rollback()
+            raise
+        await db.commit()
 
 
 async def close_db():
     """Close the database connection."""
-    global _db
+    global _db, _vec_enabled, _memories_fts, _readers
+    _readers = None
+    for conn in _reader_conns:
+        await conn.close()
+    _reader_conns.clear()
     if _db is not None:
         await _db.close()
         _db = None
+        _vec_enabled = False
+        _memories_fts = False
+        _vec_tables.clear()
 
 
 # ============================================================
@@ -283,107 +595,334 @@ async def close_db():
 # ============================================================
 
 
+_UTC = timezone.utc
+# (epoch second, its "YYYY-MM-DDTHH:MM:SS" form) for _now_iso
+_iso_second: tuple[int, str] = (-1, "")
+
+
+def _now_iso() -> str:
+    """Same string as datetime.now(timezone.utc).isoformat(), cheaper in bursts.
+
+    The date/time part is formatted once per second; only the microseconds
+    change between calls.
+    """
+    global _iso_second
+    sec, us = divmod(time.time_ns() // 1000, 1_000_000)
+    if sec != _iso_second[0]:
+        _iso_second = (sec, datetime.fromtimestamp(sec, _UTC).strftime("%Y-%m-%dT%H:%M:%S"))
+    if us:
+        return f"{_iso_second[1]}.{us:06d}+00:00"
+    return f"{_iso_second[1]}+00:00"
+
+
 def generate_mem_key(agent_id: str, message: dict) -> str:
     """Generate a unique key for a memory entry (KS2.2 compatible)."""
-    ts = message.get("timestamp", datetime.now(timezone.utc).isoformat())
+    ts = message["timestamp"] if "timestamp" in message else _now_iso()
     content = message.get("content", "")
     hash_input = f"{agent_id}:{ts}:{content}"
-    short_hash = hashlib.sha256(hash_input.encode()).hexdigest()[:8]
+    # 32-bit disambiguator, not a security boundary: BLAKE2b with a 4-byte
+    # digest gives the same 8 hex chars without hashing a full SHA-256
+    short_hash = hashlib.blake2b(hash_input.encode(), digest_size=4).hexdigest()
     return f"mem:{agent_id}:{ts}:{short_hash}"
 
 
+_SQL_STORE_INSERT = """INSERT INTO memories (agent_id, msg_id, content, source, timestamp,
+                                              metadata, embedding, embedding_bin)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT DO NOTHING"""
+
+_SQL_DEDUP_SELECT = "SELECT id FROM memories WHERE agent_id = ? AND msg_id = ? LIMIT 1"
+
+
+def _pack_for_store(embedding: list[float] | None) -> tuple[bytes | None, bytes | None]:
+    """(embedding, embedding_bin) column values for a computed embedding."""
+    if not embedding:
+        return None, None
+    return (
+        EmbeddingClient.pack_embedding(embedding),
+        EmbeddingClient.pack_sign_bits(embedding),
+    )
+
+
 async def do_store(agent_id: str, message: dict) -> dict:
     """Store a message in agent memory."""
     db = await get_db()
 
     msg_id = message.get("id", "")
     content = message.get("content", "")
-    source = json.dumps(message.get("source", {}))
-    timestamp = message.get(
-        "timestamp", datetime.now(timezone.utc).isoformat()
-    )
-    metadata = json.dumps(message.get("metadata", {}))
+    source = _json_dumps(message.get("source", {}))
+    # Only format the current time when the message carries no timestamp
+    timestamp = message["timestamp"] if "timestamp" in message else _now_iso()
+    metadata = _json_dumps(message.get("metadata", {}))
 
     if not content:
         return {"ok": True, "skipped": True, "reason": "empty content"}
 
-    # Deduplicate by msg_id if provided
-    if msg_id:
-        row = await db.execute_fetchall(
-            "SELECT id FROM memories WHERE agent_id = ? AND msg_id = ? LIMIT 1",
-            (agent_id, msg_id),
-        )
+    # Deduplicate by msg_id if provided. With the unique index the INSERT
+    # skips duplicates itself; the SELECT only still pays off when it saves
+    # an embedding request.
+    if msg_id and (_embedding_client or not _msg_id_unique):
+        row = await db.execute_fetchall(_SQL_DEDUP_SELECT, (agent_id, msg_id))
         if row:
             return {"ok": True, "skipped": True, "reason": "duplicate msg_id"}
 
+    row = (agent_id, msg_id, content, source, timestamp, metadata)
+    if EMBED_BATCH and _embedding_client:
+        return await _store_batched(row)
+
     # Compute embedding before insert (so we can include it in the INSERT)
+    embedding = None
     embedding_blob = None
+    embedding_bits = None
     if _embedding_client:
         try:
             embeddings = await _embedding_client.embed([content])
-            if embeddings and embeddings[0]:
-                embedding_blob = EmbeddingClient.pack_embedding(embeddings[0])
+            if embeddings:
+                embedding = embeddings[0]
+                embedding_blob, embedding_bits = _pack_for_store(embedding)
         except Exception as e:
             logger.warning("Embedding failed during store: %s", e)
-
-    await db.execute(
-        """INSERT INTO memories (agent_id, msg_id, content, source, timestamp, metadata, embedding)
-           VALUES (?, ?, ?, ?, ?, ?, ?)""",
-        (agent_id, msg_id, content, source, timestamp, metadata, embedding_blob),
-    )
-    await db.commit()
+    if embedding_blob is not None and _vec_enabled:
+        await _ensure_vec_table("memories", len(embedding))
+
+    async with write_transaction(db):
+        cursor = await db.execute(_SQL_STORE_INSERT, (*row, embedding_blob, embedding_bits))
+        inserted = cursor.rowcount > 0
+        if inserted and embedding_blob is not None and _vec_enabled:
+            await _index_embedding(db, "memories", cursor.lastrowid, agent_id, embedding)
+    if not inserted:
+        return {"ok": True, "skipped": True, "reason": "duplicate msg_id"}
     return {"ok": True}
 
 
+# KS22_EMBED_BATCH: stores queue (row, future) pairs here and one background
+# task embeds and inserts each group (see _write_store_batch).
+_store_queue: asyncio.Queue | None = None
+_store_task: asyncio.Task | None = None
+
+
+async def _store_batched(row: tuple) -> dict:
+    """Queue a memory row for the store batcher and wait for its result."""
+    global _store_queue, _store_task
+    if _store_task is None:
+        _store_queue = asyncio.Queue()
+        _store_task = asyncio.create_task(_store_batch_loop())
+    future = asyncio.get_running_loop().create_future()
+    _store_queue.put_nowait((row, future))
+    return await future
+
+
+async def stop_store_batcher() -> None:
+    """Stop the store batcher; stores still waiting in the queue are cancelled."""
+    global _store_queue, _store_task
+    if _store_task is None:
+        return
+    _store_task.cancel()
+    try:
+        await _store_task
+    except asyncio.CancelledError:
+        pass
+    while not _store_queue.empty():
+        _, future = _store_queue.get_nowait()
+        future.cancel()
+    _store_queue = None
+    _store_task = None
+
+
+async def _store_batch_loop() -> None:
+    """Collect up to EMBED_BATCH_MAX queued stores at a time and write them."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _store_queue.get()]
+        try:
+            deadline = loop.time() + EMBED_BATCH_WINDOW_SECS
+            while len(batch) < EMBED_BATCH_MAX:
+                if not _store_queue.empty():
+                    batch.append(_store_queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(_store_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            results = await _write_store_batch([row for row, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+        except BaseException:
+            for _, future in batch:
+                future.cancel()
+            raise
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+async def _write_store_batch(rows: list[tuple]) -> list[dict | Exception]:
+    """Embed rows with one request and insert them in one transaction.
+
+    Returns do_store's result for each row, or the error its INSERT raised;
+    a failing row does not keep the others from being stored. A msg_id
+    repeated within the batch is stored once, like do_store's duplicate
+    check. A msg_id stored since do_store checked (e.g. by the previous
+    batch) is skipped by the INSERT's ON CONFLICT clause and reported as a
+    duplicate too.
+    """
+    db = await get_db()
+    embeddings = await _embedding_client.embed([row[2] for row in rows])
+    if not embeddings or len(embeddings) != len(rows):
+        embeddings = [None] * len(rows)
+
+    results = []
+    params = []
+    stored = []
+    seen_msg_ids = set()
+    for row, embedding in zip(rows, embeddings):
+        agent_id, msg_id = row[0], row[1]
+        if msg_id:
+            if (agent_id, msg_id) in seen_msg_ids:
+                results.append({"ok": True, "skipped": True, "reason": "duplicate msg_id"})
+                continue
+            seen_msg_ids.add((agent_id, msg_id))
+        params.append((*row, *_pack_for_store(embedding)))
+        stored.append((embedding, len(results)))
+        results.append({"ok": True})
+
+    if _vec_enabled:
+        for dim in {len(embedding) for embedding, _ in stored if embedding}:
+            await _ensure_vec_table("memories", dim)
+
+    # executemany reports neither row ids (needed by the vec index) nor which
+    # rows ON CONFLICT skipped, so rows with a msg_id are inserted one by one.
+    # Runs of rows without one cannot conflict and are inserted together;
+    # if such a run fails, the batch is rolled back and retried row by row
+    # to find the failing rows.
+    try:
+        async with write_transaction(db):
+            bulk = []
+            for values, (embedding, i) in zip(params, stored):
+                if not values[1] and not _vec_enabled:
+                    bulk.append(values)
+                    continue
+                if bulk:
+                    await db.executemany(_SQL_STORE_INSERT, bulk)
+                    bulk = []
+                await _insert_store_row(db, values, embedding, results, i)
+            if bulk:
+                await db.executemany(_SQL_STORE_INSERT, bulk)
+    except aiosqlite.Error:
+        async with write_transaction(db):
+            for values, (embedding, i) in zip(params, stored):
+                results[i] = {"ok": True}
+                await _insert_store_row(db, values, embedding, results, i)
+    return results
+
+
+async def _insert_store_row(
+    db: aiosqlite.Connection,
+    values: tuple,
+    embedding: list[float] | None,
+    results: list,
+    i: int,
+) -> None:
+    """Insert one batched row, recording a duplicate or its error in results[i]."""
+    try:
+        cursor = await db.execute(_SQL_STORE_INSERT, values)
+    except aiosqlite.Error as e:
+        results[i] = e
+        return
+    if cursor.rowcount == 0:
+        results[i] = {"ok": True, "skipped": True, "reason": "duplicate msg_id"}
+    elif embedding and _vec_enabled:
+        await _index_embedding(db, "memories", cursor.lastrowid, values[0], embedding)
+
+
+_SQL_PROFILES_RECENT = """SELECT content FROM profiles WHERE agent_id = ?
+                          ORDER BY updated_at DESC LIMIT 3"""
+
+
 async def do_recall(agent_id: str, query: str, limit: int) -> dict:
     """Recall relevant memories using multi-strategy search."""
-    db = await get_db()
     results: list[dict] = []
     seen_ids: set = set()
 
-    # Strategy 0: Vector search (if embedding available and query non-empty)
-    if _embedding_client and query.strip():
-        vector_results = await _search_vector(db, agent_id, query, limit)
-        for row in vector_results:
-            rid = row.get("_rid", row["id"])
-            if rid not in seen_ids:
-                results.append(row)
-                seen_ids.add(rid)
+    async with read_db() as db:
+        # Embed the query once; every vector-based strategy shares it. The
+        # request runs in the background while the FTS and profile reads execute.
+        embed_task = None
+        if _embedding_client and query.strip():
+            embed_task = asyncio.create_task(_embedding_client.embed_query(query))
+
+        # Without vector results the keyword fallback is nearly always
+        # reached, so it is dispatched with the other reads. It fetches the
+        # full limit and is cut to what remains once the rest is merged.
+        keyword_task = None
+        if embed_task is None:
+            keyword_task = asyncio.create_task(
+                _search_memories_keyword(db, agent_id, query, limit)
+            )
 
-    # Strategy 1: FTS5 episode search (if enabled and query non-empty)
-    if FTS_ENABLED and query.strip():
-        fts_results = await _search_episodes_fts(db, agent_id, query, limit)
+        try:
+            fts_results = []
+            if FTS_ENABLED and query.strip():
+                fts_results = await _search_episodes_fts(db, agent_id, query, limit)
+            profile_rows = await db.execute_fetchall(_SQL_PROFILES_RECENT, (agent_id,))
+            query_embedding = await embed_task if embed_task else None
+            memory_rows = await keyword_task if keyword_task else None
+        except BaseException:
+            for task in (embed_task, keyword_task):
+                if task:
+                    task.cancel()
+            raise
+
+        # Strategy 0: Vector search (if the query could be embedded)
+        if query_embedding is not None:
+            vector_results = await _search_vector(db, agent_id, query_embedding, limit)
+            for row in vector_results:
+                rid = row.get("_rid", row["id"])
+                if rid not in seen_ids:
+                    results.append(row)
+                    seen_ids.add(rid)
+
+        # Strategy 1: FTS5 episode search (if enabled and query non-empty)
         for row in fts_results:
             rid = ("ep", row["id"])
             if rid not in seen_ids:
                 results.append(row)
                 seen_ids.add(rid)
 
-    # Strategy 2: Profile lookup
-    profile_rows = await db.execute_fetchall(
-        "SELECT content FROM profiles WHERE agent_id = ? ORDER BY updated_at DESC LIMIT 3",
-        (agent_id,),
-    )
-    for (profile_content,) in profile_rows:
-        # Inject profile as a system-context memory
-        results.append({
-            "id": -1,
-            "content": f"[Profile] {profile_content}",
-            "source": {"System": "profile"},
-            "timestamp": "",
-        })
-
-    # Strategy 3: Keyword match on memories (KS2.2 fallback)
-    remaining = max(0, limit - len(results))
-    if remaining > 0:
-        memory_rows = await _search_memories_keyword(
-            db, agent_id, query, remaining
-        )
-        for row in memory_rows:
-            rid = ("mem", row["id"])
-            if rid not in seen_ids:
-                results.append(row)
-                seen_ids.add(rid)
+        # Strategy 2: Profile lookup
+        for (profile_content,) in profile_rows:
+            # Inject profile as a system-context memory
+            results.append({
+                "id": -1,
+                "content": f"[Profile] {profile_content}",
+                "source": {"System": "profile"},
+                "timestamp": "",
+            })
+
+        # Strategy 3: Keyword match on memories (KS2.2 fallback)
+        remaining = max(0, limit - len(results))
+        if remaining > 0:
+            if memory_rows is None:
+                memory_rows = await _search_memories_keyword(
+                    db, agent_id, query, remaining
+                )
+            for row in memory_rows[:remaining]:
+                rid = ("mem", row["id"])
+                if rid not in seen_ids:
+                    results.append(row)
+                    seen_ids.add(rid)
 
     # Truncate to limit and reverse for chronological order (oldest first for LLM)
     results = results[:limit]
@@ -407,89 +946,394 @@ async def do_recall(agent_id: str, query: str, limit: int) -> dict:
 
 
 async def _search_vector(
-    db: aiosqlite.Connection, agent_id: str, query: str, limit: int
+    db: aiosqlite.Connection, agent_id: str, query_embedding: list[float], limit: int
 ) -> list[dict]:
     """Search memories and episodes using vector cosine similarity."""
     import numpy as np
 
-    # 1. Compute query embedding
-    embeddings = await _embedding_client.embed([query])
-    if not embeddings or not embeddings[0]:
-        return []
-    query_vec = np.array(embeddings[0], dtype=np.float32)
-    query_dim = len(query_vec)
+    # 1. Query embedding (computed once by do_recall)
+    query_vec = np.array(query_embedding, dtype=np.float32)
 
     candidates: list[tuple[float, dict]] = []
 
     # 2. Search memory embeddings
-    rows = await db.execute_fetchall(
-        """SELECT id, msg_id, content, source, timestamp, embedding
-           FROM memories
-           WHERE agent_id = ? AND embedding IS NOT NULL
-           ORDER BY created_at DESC
-           LIMIT ?""",
-        (agent_id, MAX_MEMORIES),
+    matches = await _search_embeddings(
+        db, "memories", "id, msg_id, content, source, timestamp",
+        agent_id, query_vec, limit,
     )
 
-    for row in rows:
-        mem_id, msg_id, content, source, timestamp, blob = row
-        try:
-            mem_vec = np.frombuffer(blob, dtype=np.float32)
-            if len(mem_vec) != query_dim:
-                continue  # Dimension mismatch (provider changed)
-            sim = float(np.dot(query_vec, mem_vec))
-            if sim >= VECTOR_MIN_SIMILARITY:
-                candidates.append((sim, {
-                    "id": mem_id,
-                    "_rid": ("mem", mem_id),
-                    "msg_id": msg_id,
-                    "content": content,
-                    "source": source,
-                    "timestamp": timestamp,
-                }))
-        except Exception:
-            continue
+    for sim, row in matches:
+        mem_id, msg_id, content, source, timestamp = row
+        candidates.append((sim, {
+            "id": mem_id,
+            "_rid": ("mem", mem_id),
+            "msg_id": msg_id,
+            "content": content,
+            "source": source,
+            "timestamp": timestamp,
+        }))
 
     # 3. Search episode embeddings
-    ep_rows = await db.execute_fetchall(
-        """SELECT id, summary, start_time, embedding
-           FROM episodes
-           WHERE agent_id = ? AND embedding IS NOT NULL
-           ORDER BY created_at DESC
-           LIMIT ?""",
-        (agent_id, MAX_MEMORIES),
+    ep_matches = await _search_embeddings(
+        db, "episodes", "id, summary, start_time",
+        agent_id, query_vec, limit,
     )
 
-    for row in ep_rows:
-        ep_id, summary, start_time, blob = row
-        try:
-            ep_vec = np.frombuffer(blob, dtype=np.float32)
-            if len(ep_vec) != query_dim:
-                continue
-            sim = float(np.dot(query_vec, ep_vec))
-            if sim >= VECTOR_MIN_SIMILARITY:
-                candidates.append((sim, {
-                    "id": ep_id,
-                    "_rid": ("ep", ep_id),
-                    "content": f"[Episode] {summary}",
-                    "source": {"System": "episode"},
-                    "timestamp": start_time or "",
-                }))
-        except Exception:
-            continue
+    for sim, row in ep_matches:
+        ep_id, summary, start_time = row
+        candidates.append((sim, {
+            "id": ep_id,
+            "_rid": ("ep", ep_id),
+            "content": f"[Episode] {summary}",
+            "source": {"System": "episode"},
+            "timestamp": start_time or "",
+        }))
 
     # 4. Sort by similarity descending, return top-K
     candidates.sort(key=lambda x: x[0], reverse=True)
     return [c[1] for c in candidates[:limit]]
 
 
+# SQLite's default host-parameter limit is 999 on older builds
+_MAX_IN_PARAMS = 900
+
+
+async def _search_embeddings(
+    db: aiosqlite.Connection,
+    table: str,
+    columns: str,
+    agent_id: str,
+    query_vec,
+    limit: int,
+) -> list[tuple[float, tuple]]:
+    """Best (similarity, row) matches in table for agent_id, most similar first.
+
+    Candidates are the newest MAX_MEMORIES embedded rows. With
+    KS22_BINARY_PREFILTER only their sign codes are read first and full
+    embeddings are fetched just for the shortlist from _binary_shortlist.
+    With the sqlite-vec index loaded, the candidates are instead the exact
+    top-limit neighbours over all of the agent's rows.
+
+    columns must start with id; they are only read for the returned rows.
+    """
+    ids = None
+    if _vec_enabled:
+        ids = await _vec_knn(db, table, agent_id, query_vec, limit)
+    elif BINARY_PREFILTER:
+        ids = await _binary_shortlist(db, table, agent_id, query_vec, limit)
+    if ids is not None and not ids:
+        return []
+
+    packed = await _fetch_packed_embeddings(db, table, agent_id, len(query_vec), ids)
+    scored = _score_embeddings(packed, query_vec)
+    # Stable sort: equal scores keep their candidate order
+    scored.sort(key=lambda x: x[0], reverse=True)
+    best = scored[:limit]
+    if not best:
+        return []
+
+    rows = await db.execute_fetchall(
+        f"SELECT {columns} FROM {table} WHERE id IN ({','.join('?' * len(best))})",
+        [row_id for _, row_id in best],
+    )
+    by_id = {row[0]: row for row in rows}
+    return [(sim, by_id[row_id]) for sim, row_id in best if row_id in by_id]
+
+
+# Rows whose embedding has the query's dimension, in either layout: float32
+# (4 * dim bytes, no int8 magic) or int8 (magic + scale + dim codes).
+# Parameters come from _dim_filter_params.
+_SQL_DIM_FILTER = (
+    "((length(embedding) = ? AND substr(embedding, 1, 4) != ?) "
+    "OR (length(embedding) = ? AND substr(embedding, 1, 4) = ?))"
+)
+
+
+def _dim_filter_params(dim: int) -> tuple:
+    """Parameters of _SQL_DIM_FILTER for dim."""
+    magic = EmbeddingClient.INT8_MAGIC
+    return (4 * dim, magic, 8 + dim, magic)
+
+
+async def _fetch_packed_embeddings(
+    db: aiosqlite.Connection,
+    table: str,
+    agent_id: str,
+    dim: int,
+    ids: list[int] | None,
+) -> tuple:
+    """Candidate embeddings of table concatenated per layout by SQLite.
+
+    Returns (f32_ids, f32_blob, i8_ids, i8_blob): comma-separated ids and
+    the matching embeddings back to back, for float32 (4 * dim bytes) and
+    int8 (INT8_MAGIC + scale + dim bytes) rows. Either pair is None when no
+    row has that layout. Rows of another dimension (provider changed) are
+    filtered out in SQL, so they neither use up candidate slots nor reach
+    NumPy.
+    Concatenating in SQL hands NumPy one buffer per layout instead of a
+    bytes object per row, and skips reading the text columns of rows that
+    will not be returned.
+    """
+    magic = EmbeddingClient.INT8_MAGIC
+    if ids is None:
+        candidates = (
+            f"SELECT id, embedding FROM {table} "
+            f"WHERE agent_id = ? AND embedding IS NOT NULL "
+            f"AND {_SQL_DIM_FILTER} "
+            f"ORDER BY created_at DESC LIMIT ?"
+        )
+        params = (agent_id, *_dim_filter_params(dim), MAX_MEMORIES)
+    else:
+        candidates = (
+            f"SELECT id, embedding FROM {table} "
+            f"WHERE agent_id = ? AND embedding IS NOT NULL "
+            f"AND {_SQL_DIM_FILTER} "
+            f"AND id IN ({','.join('?' * len(ids))}) "
+            f"ORDER BY created_at DESC"
+        )
+        params = (agent_id, *_dim_filter_params(dim), *ids)
+
+    rows = await db.execute_fetchall(
+        f"""SELECT group_concat(CASE WHEN substr(embedding, 1, 4) != ? THEN id END),
+                   CAST(group_concat(CASE WHEN substr(embedding, 1, 4) != ?
+                                          THEN embedding END, '') AS BLOB),
+                   group_concat(CASE WHEN substr(embedding, 1, 4) = ? THEN id END),
+                   CAST(group_concat(CASE WHEN substr(embedding, 1, 4) = ?
+                                          THEN embedding END, '') AS BLOB)
+            FROM ({candidates})""",
+        (magic, magic, magic, magic, *params),
+    )
+    return rows[0]
+
+
+# vec0 caps k for KNN queries
+_VEC_MAX_K = 4096
+
+
+def _as_float32_blob(blob: bytes, dim: int) -> bytes | None:
+    """Stored embedding as raw float32 bytes for sqlite-vec; None if not dim-sized."""
+    if blob[:4] == EmbeddingClient.INT8_MAGIC:
+        if len(blob) == 8 + dim:
+            return struct.pack(f"<{dim}f", *EmbeddingClient.unpack_embedding(blob))
+        return None
+    if len(blob) == 4 * dim:
+        return blob
+    return None
+
+
+async def _ensure_vec_table(table: str, dim: int) -> str:
+    """Name of table's sqlite-vec index for dim, building it if missing.
+
+    One vec0 table per (table, dimension), partitioned by agent_id. On
+    first use per process the index is backfilled from every stored
+    embedding of that dimension it does not hold yet (rows stored while it
+    was not maintained, e.g. with KS22_VEC_INDEX off) and committed before
+    it is recorded as known. Writers call this before inserting the row
+    they index, so the backfill never already holds it.
+    """
+    name = f"{table}_vec_{dim}"
+    if name in _vec_tables:
+        return name
+
+    # Concurrent first stores and recalls would otherwise all try to build it
+    async with _vec_lock:
+        if name in _vec_tables:
+            return name
+        # Building the index writes, so it always goes through the writer
+        db = await get_db()
+        exists = await db.execute_fetchall(
+            "SELECT 1 FROM sqlite_master WHERE name = ?", (name,)
+        )
+        # Readers only see the index once it is committed
+        async with write_transaction(db):
+            if exists:
+                rows = await db.execute_fetchall(
+                    f"SELECT id, agent_id, embedding FROM {table} "
+                    f"WHERE embedding IS NOT NULL AND id NOT IN (SELECT rowid FROM {name})"
+                )
+            else:
+                await db.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING vec0("
+                    f"agent_id text partition key, "
+                    f"embedding float[{dim}] distance_metric=cosine)"
+                )
+                rows = await db.execute_fetchall(
+                    f"SELECT id, agent_id, embedding FROM {table} WHERE embedding IS NOT NULL"
+                )
+            backfill = []
+            for row_id, agent_id, blob in rows:
+                vec = _as_float32_blob(blob, dim)
+                if vec is not None:
+                    backfill.append((row_id, agent_id, vec))
+            await db.executemany(
+                f"INSERT INTO {name}(rowid, agent_id, embedding) VALUES (?, ?, ?)",
+                backfill,
+            )
+        if not exists:
+            logger.info("Built %s (%d vectors)", name, len(backfill))
+        elif backfill:
+            logger.info("Added %d missing vectors to %s", len(backfill), name)
+        _vec_tables.add(name)
+    return name
+
+
+async def _index_embedding(
+    db: aiosqlite.Connection,
+    table: str,
+    row_id: int,
+    agent_id: str,
+    embedding: list[float],
+) -> None:
+    """Add a newly inserted row's embedding to the sqlite-vec index.
+
+    The caller must have ensured the index (_ensure_vec_table) before
+    inserting the row.
+    """
+    await db.execute(
+        f"INSERT INTO {table}_vec_{len(embedding)}(rowid, agent_id, embedding) "
+        f"VALUES (?, ?, ?)",
+        (row_id, agent_id, struct.pack(f"<{len(embedding)}f", *embedding)),
+    )
+
+
+async def _vec_knn(
+    db: aiosqlite.Connection, table: str, agent_id: str, query_vec, limit: int
+) -> list[int]:
+    """Ids of agent_id's limit nearest rows by cosine distance, via sqlite-vec."""
+    name = await _ensure_vec_table(table, len(query_vec))
+    rows = await db.execute_fetchall(
+        f"SELECT rowid FROM {name} "
+        f"WHERE embedding MATCH ? AND k = ? AND agent_id = ?",
+        (query_vec.tobytes(), min(limit, _VEC_MAX_K), agent_id),
+    )
+    return [row[0] for row in rows]
+
+
+async def _binary_shortlist(
+    db: aiosqlite.Connection, table: str, agent_id: str, query_vec, limit: int
+) -> list[int] | None:
+    """Ids of the rows closest to query_vec by sign-code Hamming distance.
+
+    Keeps the best limit * BINARY_PREFILTER_FACTOR coded rows plus every row
+    stored before sign codes existed. Returns None when pruning would not
+    shrink the candidate set, so the caller scans everything as usual.
+    """
+    import numpy as np
+
+    keep = limit * BINARY_PREFILTER_FACTOR
+    dim = len(query_vec)
+    rows = await db.execute_fetchall(
+        f"""SELECT id, embedding_bin FROM {table}
+            WHERE agent_id = ? AND embedding IS NOT NULL
+            AND {_SQL_DIM_FILTER}
+            ORDER BY created_at DESC
+            LIMIT ?""",
+        (agent_id, *_dim_filter_params(dim), MAX_MEMORIES),
+    )
+    if len(rows) <= keep:
+        return None
+
+    q_bits = np.packbits(query_vec > 0)
+    nbytes = len(q_bits)
+    coded = [row for row in rows if row[1] is not None and len(row[1]) == nbytes]
+    uncoded = [row[0] for row in rows if row[1] is None]
+    if len(coded) <= keep or keep + len(uncoded) > _MAX_IN_PARAMS:
+        return None
+
+    bits = np.frombuffer(b"".join(row[1] for row in coded), dtype=np.uint8)
+    bits = bits.reshape(len(coded), nbytes)
+    if simsimd is not None:
+        dist = np.asarray(
+            simsimd.cdist(q_bits, bits, metric="hamming", dtype="bin8")
+        ).ravel()
+    else:
+        popcount = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(1)
+        dist = popcount[bits ^ q_bits].sum(axis=1)
+    best = np.argpartition(dist, keep)[:keep]
+    return [coded[i][0] for i in best] + uncoded
+
+
+def _score_embeddings(packed: tuple, query_vec) -> list[tuple[float, int]]:
+    """Score _fetch_packed_embeddings output against query_vec.
+
+    Each layout is scored with one matrix-vector product. Returns
+    (similarity, id) pairs at or above VECTOR_MIN_SIMILARITY, float32 rows
+    first, each layout in candidate order.
+
+    The float32 product stays on NumPy's BLAS sgemv: SimSIMD's f32 cdist
+    measured 20-45% slower than it for 500-5000 rows of 384-1536 dims, and a
+    Numba kernel specialized to the dimension only matched it (within 8%
+    either way), so neither is used there. SimSIMD's int8 kernel is ~3x
+    faster than that sgemv, so int8 rows use it if installed.
+
+    The threshold is applied after the full product. For unit vectors the
+    bound on the unread dimensions (the norm of the rest of the query) keeps
+    a partial sum from ruling a row out until ~90% of them are summed, so
+    exiting early would save little and cost the BLAS call.
+    """
+    import numpy as np
+
+    f32_ids, f32_blob, i8_ids, i8_blob = packed
+    dim = len(query_vec)
+    scored: list[tuple[float, int]] = []
+
+    if f32_blob:
+        matrix = np.frombuffer(f32_blob, dtype=np.float32).reshape(-1, dim)
+        scored.extend(_above_threshold(f32_ids, matrix @ query_vec))
+
+    if i8_blob:
+        # INT8_MAGIC, float32 scale, dim codes per row
+        packed_rows = np.frombuffer(i8_blob, dtype=np.uint8).reshape(-1, 8 + dim)
+        row_scales = packed_rows[:, 4:8].copy().view("<f4").ravel()
+        codes = packed_rows[:, 8:].view(np.int8)
+        if simsimd is not None:
+            q_scale, q_codes = EmbeddingClient.quantize_int8(query_vec)
+            dots = np.asarray(
+                simsimd.cdist(q_codes, np.ascontiguousarray(codes), metric="dot")
+            ).ravel() * q_scale
+        else:
+            dots = codes.astype(np.float32) @ query_vec
+        scores = (dots * row_scales).astype(np.float32)
+        scored.extend(_above_threshold(i8_ids, scores))
+
+    return scored
+
+
+def _above_threshold(ids: str, scores) -> list[tuple[float, int]]:
+    """(score, id) for scores >= VECTOR_MIN_SIMILARITY; ids as from group_concat."""
+    import numpy as np
+
+    id_list = ids.split(",")
+    return [
+        (float(scores[i]), int(id_list[i]))
+        for i in np.flatnonzero(scores >= VECTOR_MIN_SIMILARITY)
+    ]
+
+
+# Everything except word characters (alphanumeric, CJK) and whitespace
+_FTS_SANITIZE = re.compile(r"[^\w\s]", re.UNICODE)
+
+
+# The plan already drives from the FTS index in rank order (SCAN f
+# VIRTUAL TABLE INDEX 32:M2) and probes episodes by rowid. Pre-limiting
+# matches in a CTE before the agent filter was no faster and could return
+# fewer than `limit` rows when other agents' episodes rank higher.
+_SQL_FTS_SEARCH = """SELECT e.id, e.summary, e.start_time
+                     FROM episodes_fts f
+                     JOIN episodes e ON f.rowid = e.id
+                     WHERE episodes_fts MATCH ?
+                     AND e.agent_id = ?
+                     ORDER BY rank
+                     LIMIT ?"""
+
+
 async def _search_episodes_fts(
     db: aiosqlite.Connection, agent_id: str, query: str, limit: int
 ) -> list[dict]:
     """Search episodes using FTS5."""
     # Sanitize: strip everything except alphanumeric, CJK, and whitespace
     # to prevent FTS5 operator injection (AND/OR/NOT/NEAR/*/^/- etc.)
-    sanitized = re.sub(r'[^\w\s]', "", query, flags=re.UNICODE)
+    sanitized = _FTS_SANITIZE.sub("", query)
     words = sanitized.split()
     if not words:
         return []
@@ -497,16 +1341,7 @@ async def _search_episodes_fts(
     # Each word quoted for phrase matching; quotes inside words already stripped
     fts_query = " ".join(f'"{w}"' for w in words)
 
-    rows = await db.execute_fetchall(
-        """SELECT e.id, e.summary, e.start_time
-           FROM episodes_fts f
-           JOIN episodes e ON f.rowid = e.id
-           WHERE episodes_fts MATCH ?
-           AND e.agent_id = ?
-           ORDER BY rank
-           LIMIT ?""",
-        (fts_query, agent_id, limit),
-    )
+    rows = await db.execute_fetchall(_SQL_FTS_SEARCH, (fts_query, agent_id, limit))
 
     return [
         {
@@ -519,45 +1354,93 @@ async def _search_episodes_fts(
     ]
 
 
+# LIKE wildcards have no trigram equivalent; such queries keep the plain scan
+_LIKE_WILDCARDS = re.compile(r"[%_]")
+
+# Newest rows checked with LIKE before falling back to the trigram index
+_KEYWORD_PROBE_ROWS = 200
+
+_SQL_KW_PROBE = """SELECT id, msg_id, content, source, timestamp
+                   FROM (SELECT id, msg_id, content, source, timestamp, created_at
+                         FROM memories
+                         WHERE agent_id = ?
+                         ORDER BY created_at DESC
+                         LIMIT ?)
+                   WHERE content LIKE ?
+                   ORDER BY created_at DESC
+                   LIMIT ?"""
+
+# CROSS JOIN pins the FTS table as the outer loop
+_SQL_KW_FTS = """SELECT m.id, m.msg_id, m.content, m.source, m.timestamp
+                 FROM memories_fts f
+                 CROSS JOIN memories m ON m.id = f.rowid
+                 WHERE memories_fts MATCH ?
+                 AND m.agent_id = ?
+                 AND m.content LIKE ?
+                 ORDER BY m.created_at DESC
+                 LIMIT ?"""
+
+_SQL_KW_SEARCH = """SELECT id, msg_id, content, source, timestamp
+                    FROM memories
+                    WHERE agent_id = ?
+                    AND content LIKE ?
+                    ORDER BY created_at DESC
+                    LIMIT ?"""
+
+_SQL_KW_RECENT = """SELECT id, msg_id, content, source, timestamp
+                    FROM memories
+                    WHERE agent_id = ?
+                    ORDER BY created_at DESC
+                    LIMIT ?"""
+
+
 async def _search_memories_keyword(
     db: aiosqlite.Connection, agent_id: str, query: str, limit: int
 ) -> list[dict]:
     """Search memories using keyword matching (KS2.2 compatible fallback)."""
-    if query.strip():
-        # Keyword match
+    # Matches are capped at MAX_MEMORIES; only the newest `limit` are returned
+    fetch = min(limit, MAX_MEMORIES)
+    pattern = f"%{query}%"
+    if query.strip() and _memories_fts and len(query) >= 3 and not _LIKE_WILDCARDS.search(query):
+        # A frequent term matches thousands of rows, and the trigram path has
+        # to sort all of them by recency, while the newest rows usually hold
+        # `fetch` matches already. If they do, those are exactly the first
+        # `fetch` matches, in the same order.
         rows = await db.execute_fetchall(
-            """SELECT id, msg_id, content, source, timestamp
-               FROM memories
-               WHERE agent_id = ?
-               AND content LIKE ?
-               ORDER BY created_at DESC
-               LIMIT ?""",
-            (agent_id, f"%{query}%", MAX_MEMORIES),
+            _SQL_KW_PROBE, (agent_id, _KEYWORD_PROBE_ROWS, pattern, fetch)
         )
+        if len(rows) < fetch:
+            # Same substring match, but driven from the trigram index: the
+            # phrase MATCH finds a (case-folded) superset and LIKE keeps exact
+            # semantics.
+            rows = await db.execute_fetchall(
+                _SQL_KW_FTS,
+                ('"' + query.replace('"', '""') + '"', agent_id, pattern, fetch),
+            )
+    elif query.strip():
+        # Keyword match (short queries have no trigram to look up)
+        rows = await db.execute_fetchall(_SQL_KW_SEARCH, (agent_id, pattern, fetch))
     else:
         # No query — return recent memories
-        rows = await db.execute_fetchall(
-            """SELECT id, msg_id, content, source, timestamp
-               FROM memories
-               WHERE agent_id = ?
-               ORDER BY created_at DESC
-               LIMIT ?""",
-            (agent_id, limit),
-        )
+        rows = await db.execute_fetchall(_SQL_KW_RECENT, (agent_id, limit))
 
-    results = []
-    for row in rows:
-        results.append({
+    return [
+        {
             "id": row[0],
             "msg_id": row[1],
             "content": row[2],
             "source": row[3],
             "timestamp": row[4],
-        })
-        if len(results) >= limit:
-            break
+        }
+        for row in rows
+    ]
 
-    return results
+
+_SQL_PROFILE_UPSERT = """INSERT INTO profiles (agent_id, user_id, content, updated_at)
+                         VALUES (?, '', ?, datetime('now'))
+                         ON CONFLICT(agent_id, user_id) DO UPDATE SET
+                             content = excluded.content,
+                             updated_at = excluded.updated_at"""
 
 
 async def do_update_profile(agent_id: str, history: list[dict]) -> dict:
@@ -583,18 +1466,25 @@ async def do_update_profile(agent_id: str, history: list[dict]) -> dict:
 
     profile_content = "\n".join(user_lines[-10:])  # Keep last 10 messages
 
-    await db.execute(
-        """INSERT INTO profiles (agent_id, user_id, content, updated_at)
-           VALUES (?, '', ?, datetime('now'))
-           ON CONFLICT(agent_id, user_id) DO UPDATE SET
-               content = excluded.content,
-               updated_at = excluded.updated_at""",
-        (agent_id, profile_content),
-    )
-    await db.commit()
+    async with write_transaction(db):
+        await db.execute(_SQL_PROFILE_UPSERT, (agent_id, profile_content))
     return {"ok": True, "profiles_updated": 1}
 
 
+_WORD_RE = re.compile(r"\b\w{3,}\b")
+
+# Common words excluded from episode keywords
+_STOPWORDS = frozenset({
+    "the", "and", "for", "that", "this", "with", "are", "was", "has", "have",
+    "not", "but", "you", "your", "can", "will", "from", "they", "been", "more",
+})
+
+
+_SQL_EPISODE_INSERT = """INSERT INTO episodes (agent_id, summary, keywords, start_time, end_time,
+                                               embedding, embedding_bin)
+                         VALUES (?, ?, ?, ?, ?, ?, ?)"""
+
+
 async def do_archive_episode(agent_id: str, history: list[dict]) -> dict:
     """Simple concatenation summary + keyword extraction (no LLM)."""
     db = await get_db()
@@ -604,8 +1494,18 @@ async def do_archive_episode(agent_id: str, history: list[dict]) -> dict:
 
     # Build text and extract simple keywords
     lines = []
-    word_freq: dict[str, int] = {}
+    word_freq: Counter[str] = Counter()
+    start_time = end_time = None
     for msg in history:
+        # Episode time span, tracked in the same pass
+        ts = msg.get("timestamp")
+        if ts:
+            if start_time is None:
+                start_time = end_time = ts
+            elif ts < start_time:
+                start_time = ts
+            elif ts > end_time:
+                end_time = ts
         content = msg.get("content", "")
         if content:
             source = msg.get("source", {})
@@ -614,8 +1514,9 @@ async def do_archive_episode(agent_id: str, history: list[dict]) -> dict:
             speaker = "User" if ("User" in source or "user" in source) else "Agent"
             lines.append(f"[{speaker}] {content}")
             # Simple word frequency for keywords
-            for word in re.findall(r'\b\w{3,}\b', content.lower()):
-                word_freq[word] = word_freq.get(word, 0) + 1
+            word_freq.update(
+                w for w in _WORD_RE.findall(content.lower()) if w not in _STOPWORDS
+            )
 
     if not lines:
         return {"ok": True, "episode_id": None}
@@ -629,43 +1530,39 @@ async def do_archive_episode(agent_id: str, history: list[dict]) -> dict:
     summary = "\n".join(summary_parts)
 
     # Keywords: top 10 by frequency (excluding common words)
-    stopwords = {"the", "and", "for", "that", "this", "with", "are", "was", "has", "have",
-                 "not", "but", "you", "your", "can", "will", "from", "they", "been", "more"}
-    sorted_words = sorted(
-        ((w, c) for w, c in word_freq.items() if w not in stopwords),
-        key=lambda x: x[1],
-        reverse=True,
-    )
-    keywords = " ".join(w for w, _ in sorted_words[:10])
-
-    # Timestamps
-    timestamps = [msg.get("timestamp", "") for msg in history if msg.get("timestamp")]
-    start_time = min(timestamps) if timestamps else None
-    end_time = max(timestamps) if timestamps else None
+    keywords = " ".join(w for w, _ in word_freq.most_common(10))
 
     # Compute embedding for episode summary
     embedding_blob = None
+    embedding_bits = None
     if _embedding_client and summary:
         try:
             embeddings = await _embedding_client.embed([summary])
             if embeddings and embeddings[0]:
                 embedding_blob = EmbeddingClient.pack_embedding(embeddings[0])
+                embedding_bits = EmbeddingClient.pack_sign_bits(embeddings[0])
         except Exception as e:
             logger.warning("Embedding failed for episode: %s", e)
-
-    cursor = await db.execute(
-        """INSERT INTO episodes (agent_id, summary, keywords, start_time, end_time, embedding)
-           VALUES (?, ?, ?, ?, ?, ?)""",
-        (agent_id, summary, keywords, start_time, end_time, embedding_blob),
-    )
-    await db.commit()
+    if embedding_blob is not None and _vec_enabled:
+        await _ensure_vec_table("episodes", len(embeddings[0]))
+
+    async with write_transaction(db):
+        cursor = await db.execute(
+            _SQL_EPISODE_INSERT,
+            (agent_id, summary, keywords, start_time, end_time,
+             embedding_blob, embedding_bits),
+        )
+        if embedding_blob is not None and _vec_enabled:
+            await _index_embedding(db, "episodes", cursor.lastrowid, agent_id, embeddings[0])
     return {"ok": True, "episode_id": cursor.lastrowid}
 
 
 def _try_parse_json(s: str) -> dict:
     """Try to parse a string as JSON, return empty dict on failure."""
+    if not s:
+        return {}
     try:
-        return json.loads(s)
+        return _json_loads(s)
     except (json.JSONDecodeError, TypeError):
         return {}
 
@@ -837,40 +1734,35 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         else:
             result = {"error": f"Unknown tool: {name}"}
 
-        return [TextContent(type="text", text=json.dumps(result))]
+        return [TextContent(type="text", text=_json_dumps(result))]
     except Exception as e:
         return [
-            TextContent(type="text", text=json.dumps({"error": str(e)}))
+            TextContent(type="text", text=_json_dumps({"error": str(e)}))
         ]
 
 
 async def do_list_memories(agent_id: str, limit: int) -> dict:
     """List recent memories for dashboard display."""
-    db = await get_db()
-    if agent_id:
-        rows = await db.execute_fetchall(
-            "SELECT id, agent_id, msg_id, content, source, timestamp, created_at "
-            "FROM memories WHERE agent_id = ? ORDER BY created_at DESC LIMIT ?",
-            (agent_id, min(limit, 500)),
-        )
-    else:
-        rows = await db.execute_fetchall(
-            "SELECT id, agent_id, msg_id, content, source, timestamp, created_at "
-            "FROM memories ORDER BY created_at DESC LIMIT ?",
-            (min(limit, 500),),
-        )
+    async with read_db() as db:
+        if agent_id:
+            rows = await db.execute_fetchall(
+                "SELECT id, agent_id, msg_id, content, source, timestamp, created_at "
+                "FROM memories WHERE agent_id = ? ORDER BY created_at DESC LIMIT ?",
+                (agent_id, min(limit, 500)),
+            )
+        else:
+            rows = await db.execute_fetchall(
+                "SELECT id, agent_id, msg_id, content, source, timestamp, created_at "
+                "FROM memories ORDER BY created_at DESC LIMIT ?",
+                (min(limit, 500),),
+            )
     memories = []
     for row in rows:
-        source = {}
-        try:
-            source = json.loads(row[4]) if row[4] else {}
-        except (json.JSONDecodeError, TypeError):
-            pass
         memories.append({
             "id": row[0],
             "agent_id": row[1],
             "content": row[3],
-            "source": source,
+            "source": _try_parse_json(row[4]),
             "timestamp": row[5],
             "created_at": row[6],
         })
@@ -879,19 +1771,19 @@ async def do_list_memories(agent_id: str, limit: int) -> dict:
 
 async def do_list_episodes(agent_id: str, limit: int) -> dict:
     """List archived episodes for dashboard display."""
-    db = await get_db()
-    if agent_id:
-        rows = await db.execute_fetchall(
-            "SELECT id, agent_id, summary, keywords, start_time, end_time, created_at "
-            "FROM episodes WHERE agent_id = ? ORDER BY created_at DESC LIMIT ?",
-            (agent_id, min(limit, 200)),
-        )
-    else:
-        rows = await db.execute_fetchall(
-            "SELECT id, agent_id, summary, keywords, start_time, end_time, created_at "
-            "FROM episodes ORDER BY created_at DESC LIMIT ?",
-            (min(limit, 200),),
-        )
+    async with read_db() as db:
+        if agent_id:
+            rows = await db.execute_fetchall(
+                "SELECT id, agent_id, summary, keywords, start_time, end_time, created_at "
+                "FROM episodes WHERE agent_id = ? ORDER BY created_at DESC LIMIT ?",
+                (agent_id, min(limit, 200)),
+            )
+        else:
+            rows = await db.execute_fetchall(
+                "SELECT id, agent_id, summary, keywords, start_time, end_time, created_at "
+                "FROM episodes ORDER BY created_at DESC LIMIT ?",
+                (min(limit, 200),),
+            )
     episodes = []
     for row in rows:
         episodes.append({
@@ -936,6 +1828,7 @@ async def main():
                 read_stream, write_stream, server.create_initialization_options()
             )
     finally:
+        await stop_store_batcher()
         await close_db()
         if _embedding_client:
             await _embedding_client.close()
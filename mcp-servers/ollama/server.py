@@ -10,10 +10,18 @@ Tools:
 """
 
 import asyncio
+import functools
 import json
 import os
+import sys
+
+# Resolve parent directory for common module import.
+# Handle Windows UNC paths (\\?\...) that Python may receive from the kernel.
+_script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.normpath(os.path.join(_script_dir, "..")))
 
 import httpx
+from common.llm_provider import THINK_INPUT_SCHEMA, build_chat_messages
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import TextContent, Tool
@@ -30,7 +38,7 @@ REQUEST_TIMEOUT = int(os.environ.get("OLLAMA_TIMEOUT_SECS", "120"))
 _active_model = MODEL_ID
 
 # ============================================================
-# LLM Utilities (shared pattern with cerebras/deepseek)
+# LLM Utilities (message building shared via common.llm_provider)
 # ============================================================
 
 
@@ -39,8 +47,13 @@ def build_system_prompt(agent: dict) -> str:
     name = agent.get("name", "Agent")
     description = agent.get("description", "")
     metadata = agent.get("metadata", {})
-
     has_memory = bool(metadata.get("preferred_memory", ""))
+    return _system_prompt_cached(str(name), str(description), has_memory)
+
+
+@functools.lru_cache(maxsize=256)
+def _system_prompt_cached(name: str, description: str, has_memory: bool) -> str:
+    """Assemble the system prompt; memoized because agents rarely change."""
     memory_line = (
         "You have persistent memory — you can recall past conversations with your operator.\n"
         if has_memory
@@ -62,27 +75,6 @@ def build_system_prompt(agent: dict) -> str:
     )
 
 
-def build_chat_messages(
-    agent: dict, message: dict, context: list[dict]
-) -> list[dict]:
-    """Build the standard OpenAI-compatible messages array."""
-    messages = [{"role": "system", "content": build_system_prompt(agent)}]
-
-    for msg in context:
-        source = msg.get("source", {})
-        src_type = source.get("type", "") if isinstance(source, dict) else ""
-        if src_type in ("User",) or "User" in source or "user" in source:
-            role = "user"
-        elif src_type in ("Agent",) or "Agent" in source or "agent" in source:
-            role = "assistant"
-        else:
-            role = "system"
-        messages.append({"role": role, "content": msg.get("content", "")})
-
-    messages.append({"role": "user", "content": message.get("content", "")})
-    return messages
-
-
 def parse_chat_content(response_data: dict) -> str:
     """Extract text content from Ollama /api/chat response.
 
@@ -112,6 +104,30 @@ def parse_chat_content(response_data: dict) -> str:
 # ============================================================
 
 
+# Shared HTTP client, created lazily inside the running event loop so that
+# repeated calls reuse keep-alive connections to the Ollama server.
+_client: httpx.AsyncClient | None = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=30),
+        )
+    return _client
+
+
+async def aclose_client() -> None:
+    """Close the shared HTTP client."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
 async def call_ollama_api(messages: list[dict]) -> dict:
     """Send a request to the Ollama native chat API (/api/chat)."""
     body: dict = {
@@ -120,28 +136,26 @@ async def call_ollama_api(messages: list[dict]) -> dict:
         "stream": False,
     }
 
-    async with httpx.AsyncClient(timeout=REQUEST_TIMEOUT) as client:
-        response = await client.post(
-            f"{BASE_URL}/api/chat",
-            json=body,
-            headers={"Content-Type": "application/json"},
+    response = await get_client().post(
+        f"{BASE_URL}/api/chat",
+        json=body,
+        headers={"Content-Type": "application/json"},
+    )
+    if response.status_code == 404:
+        raise ValueError(
+            f"Model '{_active_model}' not found in Ollama. "
+            f"Install it with: ollama pull {_active_model}"
         )
-        if response.status_code == 404:
-            raise ValueError(
-                f"Model '{_active_model}' not found in Ollama. "
-                f"Install it with: ollama pull {_active_model}"
-            )
-        response.raise_for_status()
-        return response.json()
+    response.raise_for_status()
+    return response.json()
 
 
 async def fetch_ollama_models() -> list[dict]:
     """Fetch the list of locally installed models from Ollama."""
-    async with httpx.AsyncClient(timeout=10) as client:
-        response = await client.get(f"{BASE_URL}/api/tags")
-        response.raise_for_status()
-        data = response.json()
-        return data.get("models", [])
+    response = await get_client().get(f"{BASE_URL}/api/tags", timeout=10)
+    response.raise_for_status()
+    data = response.json()
+    return data.get("models", [])
 
 
 # ============================================================
@@ -151,63 +165,49 @@ async def fetch_ollama_models() -> list[dict]:
 server = Server("cloto-mcp-ollama")
 
 
-@server.list_tools()
-async def list_tools() -> list[Tool]:
-    return [
-        Tool(
-            name="think",
-            description=(
-                "Generate a text response using a local Ollama model. "
-                "No API key required — runs entirely on local hardware."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "agent": {
-                        "type": "object",
-                        "description": "Agent metadata (name, description, metadata)",
-                    },
-                    "message": {
-                        "type": "object",
-                        "description": "User message with 'content' field",
-                    },
-                    "context": {
-                        "type": "array",
-                        "description": "Conversation context messages",
-                        "items": {"type": "object"},
-                    },
-                },
-                "required": ["agent", "message", "context"],
-            },
+# Tool definitions are static; build them once at import.
+_TOOLS = [
+    Tool(
+        name="think",
+        description=(
+            "Generate a text response using a local Ollama model. "
+            "No API key required — runs entirely on local hardware."
         ),
-        Tool(
-            name="list_models",
-            description=(
-                "List all locally installed Ollama models with size and modification date."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {},
-            },
+        inputSchema=THINK_INPUT_SCHEMA,
+    ),
+    Tool(
+        name="list_models",
+        description=(
+            "List all locally installed Ollama models with size and modification date."
         ),
-        Tool(
-            name="switch_model",
-            description=(
-                "Switch the active Ollama model for this session. "
-                "The model must be locally installed (use list_models to check)."
-            ),
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "model": {
-                        "type": "string",
-                        "description": "Model name to switch to (e.g., 'llama3.1', 'mistral', 'qwen2.5')",
-                    },
+        inputSchema={
+            "type": "object",
+            "properties": {},
+        },
+    ),
+    Tool(
+        name="switch_model",
+        description=(
+            "Switch the active Ollama model for this session. "
+            "The model must be locally installed (use list_models to check)."
+        ),
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "model": {
+                    "type": "string",
+                    "description": "Model name to switch to (e.g., 'llama3.1', 'mistral', 'qwen2.5')",
                 },
-                "required": ["model"],
             },
-        ),
-    ]
+            "required": ["model"],
+        },
+    ),
+]
+
+
+@server.list_tools()
+async def list_tools() -> list[Tool]:
+    return _TOOLS
 
 
 @server.call_tool()
@@ -234,7 +234,9 @@ async def handle_think(arguments: dict) -> list[TextContent]:
         message = arguments.get("message", {})
         context = arguments.get("context", [])
 
-        messages = build_chat_messages(agent, message, context)
+        messages = build_chat_messages(
+            agent, message, context, system_prompt=build_system_prompt(agent)
+        )
         response_data = await call_ollama_api(messages)
         content = parse_chat_content(response_data)
 
@@ -372,10 +374,13 @@ async def handle_switch_model(arguments: dict) -> list[TextContent]:
 
 
 async def main():
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream, write_stream, server.create_initialization_options()
-        )
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream, write_stream, server.create_initialization_options()
+            )
+    finally:
+        await aclose_client()
 
 
 if __name__ == "__main__":